@@ -0,0 +1,101 @@
+import json
+import multiprocessing
+import os
+import sys
+import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from csv_export_loader import read_notion_export
+from main import (NOTION_BASE_URL, NOTION_RATE, NOTION_VERSION, NotionSync, config, fetch_tracker_tables,
+                  prepare_tracker, run_streaks, token)
+from notion_client import shared_client
+
+# trackers downloaded at the same time; each token keeps its own rate limit
+DEFAULT_FETCH_WORKERS = 4
+
+OUTPUT_KEYS = ['checkpoint_file', 'streak_series_file', 'streaks_parquet_file', 'habit_facts_file']
+CALENDAR_KEYS = ['calendar_file', 'calendar_start', 'calendar_end']
+
+
+def load_manifest(path):
+    """
+    Read a JSON manifest: a list of trackers, each with a unique name, the daily_habit_tracker and habits
+    database ids (or daily_habit_tracker_export / habits_export CSV paths) and optionally a token and output paths.
+    """
+    with open(path) as f:
+        entries = json.load(f)
+    names = [entry['name'] for entry in entries]
+    if len(set(names)) != len(names):
+        raise ValueError('Tracker names in the manifest must be unique')
+    return entries
+
+
+def streaks_file_for(entry, output_dir):
+    return entry.get('streaks_file') or os.path.join(output_dir, f"{entry['name']}_streaks.csv")
+
+
+def fetch_entry(entry):
+    """Tracker and habits tables of one manifest entry, from the API or from CSV exports"""
+    if entry.get('daily_habit_tracker_export'):
+        return read_notion_export(entry['daily_habit_tracker_export']), read_notion_export(entry['habits_export'])
+    nsync = NotionSync(client=shared_client(entry.get('token') or token, NOTION_VERSION, NOTION_BASE_URL, NOTION_RATE))
+    return fetch_tracker_tables(nsync, entry['daily_habit_tracker'], entry['habits'])
+
+
+def compute_entry(entry, daily_habit_tracker_df, habits_df, output_dir, calendar):
+    """Runs in a worker process: prepare the tracker, calculate streaks and write the outputs of one entry"""
+    daily_habit_tracker_df, calendar_index = prepare_tracker(
+        daily_habit_tracker_df, habits_df, **{key: entry.get(key, calendar.get(key)) for key in CALENDAR_KEYS})
+    streaks_df = run_streaks(daily_habit_tracker_df, habits_df, calendar_index, streaks_file_for(entry, output_dir),
+                             **{key: entry.get(key) for key in OUTPUT_KEYS})
+    return len(streaks_df)
+
+
+def worker_context():
+    """
+    Start method for the streak processes. Fetch threads are already running when workers start and a forked
+    child can inherit locks they hold, so use a fork server, or spawn where that is not available (Windows).
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+def run_batch(entries, output_dir, fetch_workers=DEFAULT_FETCH_WORKERS, compute_workers=None, calendar=None):
+    """
+    Fetch every tracker on a thread pool and calculate its streaks on a process pool sized to the cores.
+    A tracker is handed to the process pool as soon as its download finishes, so downloads and
+    calculations overlap. Returns {name: number of streaks or the error message}.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    calendar = calendar or {}
+    results = {}
+    processes = ProcessPoolExecutor(max_workers=compute_workers or os.cpu_count(), mp_context=worker_context())
+    with processes, ThreadPoolExecutor(max_workers=fetch_workers) as threads:
+        fetches = {entry['name']: threads.submit(fetch_entry, entry) for entry in entries}
+        computations = {}
+        for entry in entries:
+            try:
+                daily_habit_tracker_df, habits_df = fetches[entry['name']].result()
+            except Exception as e:
+                results[entry['name']] = f'fetch failed: {e}'
+                continue
+            computations[entry['name']] = processes.submit(compute_entry, entry, daily_habit_tracker_df, habits_df,
+                                                           output_dir, calendar)
+        for name, future in computations.items():
+            try:
+                results[name] = future.result()
+            except Exception:
+                results[name] = 'streaks failed: ' + traceback.format_exc(limit=1).strip().splitlines()[-1]
+    return results
+
+
+if __name__ == '__main__':
+    manifest_file = sys.argv[1] if len(sys.argv) > 1 else config.get('batch', 'manifest_file')
+    results = run_batch(
+        load_manifest(manifest_file),
+        config.get('batch', 'output_dir', fallback='.'),
+        fetch_workers=config.getint('batch', 'fetch_workers', fallback=DEFAULT_FETCH_WORKERS),
+        compute_workers=config.getint('batch', 'compute_workers', fallback=None),
+        calendar={key: config.get('resources', key, fallback=None) for key in CALENDAR_KEYS})
+    for name, result in results.items():
+        print(f"{name}: {result}")
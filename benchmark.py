@@ -0,0 +1,159 @@
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from calendar_index import CalendarIndex
+from habit_matrix import HabitMatrix
+from main import NotionSync, fill_missing_habit_data
+from notion_extract import stream_table_data
+from notion_fixtures import CHECKBOX_PROPERTIES, habit_frames, tracker_pages
+from streak_engine import calculate_streaks
+
+DEFAULT_DAYS = 365
+DEFAULT_SCALES = [1, 10, 100]
+DEFAULT_OUTPUT = 'benchmark_baseline.json'
+# a stage is reported as a regression when it is this much slower than the baseline
+DEFAULT_TOLERANCE = 0.25
+
+
+def _pages(days, habits):
+    return (tracker_pages(days, habits),), days
+
+
+def _calendar(days, habits):
+    tracker, habits_df, calendar = habit_frames(days, habits)
+    return (tracker, calendar), days
+
+
+def _merged(days, habits):
+    tracker, habits_df, calendar = habit_frames(days, habits)
+    return (calendar_merge(tracker, calendar), habits_df), days
+
+
+def _filled(days, habits):
+    tracker, habits_df, calendar = habit_frames(days, habits)
+    filled = fill_missing_habit_data(calendar_merge(tracker, calendar), habits_df)
+    return (filled, habits_df, calendar), days
+
+
+def get_table_data(pages):
+    nsync = NotionSync()
+    data = {"results": pages}
+    columns_type = nsync.get_tablecol_type(data, nsync.get_tablecol_titles(data))
+    return nsync.get_table_data(data, columns_type)
+
+
+def extract_table_data(pages):
+    # the streaming path: one batch per 100 page response
+    return stream_table_data(pages[i:i + 100] for i in range(0, len(pages), 100)).to_dict()
+
+
+def calendar_merge(tracker, calendar):
+    calendar = calendar.rename(columns={'date': 'Date'})
+    merged = pd.merge(calendar, tracker, on='Date', how='left')
+    merged = merged.drop(columns=[col for col in calendar.columns if col != 'Date'])
+    return merged.sort_values(by='Date')
+
+
+def fill_missing(merged, habits_df):
+    return fill_missing_habit_data(merged.copy(), habits_df)
+
+
+def habit_matrix(filled, habits_df, calendar):
+    return HabitMatrix.from_frame(filled, habits_df)
+
+
+def streaks(filled, habits_df, calendar):
+    return calculate_streaks(HabitMatrix.from_frame(filled, habits_df), habits_df, CalendarIndex(calendar))
+
+
+# stage name: (setup returning (args, rows), timed function)
+STAGES = {
+    'get_table_data': (_pages, get_table_data),
+    'extract_table_data': (_pages, extract_table_data),
+    'calendar_merge': (_calendar, calendar_merge),
+    'fill_missing_habit_data': (_merged, fill_missing),
+    'habit_matrix': (_filled, habit_matrix),
+    'calculate_streaks': (_filled, streaks),
+}
+
+
+def measure(function, args, repeat):
+    """Best wall time over repeat runs, then the tracemalloc peak of one more run"""
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function(*args)
+        times.append(time.perf_counter() - started)
+    tracemalloc.start()
+    try:
+        function(*args)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return min(times), peak
+
+
+def run_benchmarks(days=DEFAULT_DAYS, habits=len(CHECKBOX_PROPERTIES), scales=DEFAULT_SCALES, repeat=3, stages=None):
+    results = {}
+    for name in stages or STAGES:
+        setup, function = STAGES[name]
+        results[name] = {}
+        for scale in scales:
+            args, rows = setup(days * scale, habits)
+            seconds, peak = measure(function, args, repeat)
+            results[name][f'{scale}x'] = {'rows': rows, 'seconds': seconds, 'peak_bytes': peak,
+                                          'seconds_per_1k_rows': seconds / rows * 1000}
+            print(f"{name:>24} {scale:>4}x {rows:>8} rows {seconds * 1000:10.2f} ms {peak / 2 ** 20:9.1f} MiB")
+    return {
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'days': days,
+        'habits': habits,
+        'results': results,
+    }
+
+
+def regressions(report, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Stages and scales that got slower than the baseline by more than the tolerance"""
+    slower = []
+    for name, scales in report['results'].items():
+        for scale, result in scales.items():
+            before = baseline.get('results', {}).get(name, {}).get(scale)
+            if before and result['seconds'] > before['seconds'] * (1 + tolerance):
+                slower.append((name, scale, before['seconds'], result['seconds']))
+    return slower
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the fetch, preparation and streak stages')
+    parser.add_argument('--days', type=int, default=DEFAULT_DAYS, help='history size at 1x')
+    parser.add_argument('--habits', type=int, default=len(CHECKBOX_PROPERTIES))
+    parser.add_argument('--scales', default=','.join(map(str, DEFAULT_SCALES)))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--stages', help='comma separated subset of ' + ', '.join(STAGES))
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='where the JSON report is written')
+    parser.add_argument('--compare', help='baseline JSON to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    options = parser.parse_args()
+
+    report = run_benchmarks(options.days, options.habits, [int(s) for s in options.scales.split(',')],
+                            options.repeat, options.stages.split(',') if options.stages else None)
+    with open(options.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    if options.compare:
+        with open(options.compare) as f:
+            slower = regressions(report, json.load(f), options.tolerance)
+        for name, scale, before, after in slower:
+            print(f"Regression: {name} at {scale} took {after * 1000:.2f} ms, baseline {before * 1000:.2f} ms")
+        sys.exit(1 if slower else 0)
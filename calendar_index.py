@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+
+def day_ordinals(dates):
+    """Convert dates to day ordinals (days since 1970-01-01)"""
+    return pd.to_datetime(pd.Series(dates)).to_numpy().astype('datetime64[D]').astype(np.int64)
+
+
+def week_index(ordinals):
+    """Absolute Monday-based week index; 1970-01-01 was a Thursday, so week 0 starts on 1969-12-29"""
+    return (np.asarray(ordinals, dtype=np.int64) + 3) // 7
+
+
+def generate_calendar(start, end):
+    """
+    Calendar dataframe for every day from start to end inclusive, in the layout of the calendar CSV.
+    week_number is the absolute week index, so it keeps increasing across year boundaries.
+    """
+    first, last = day_ordinals([start, end])
+    ordinals = np.arange(first, last + 1, dtype=np.int64)
+    dates = ordinals.astype('datetime64[D]')
+    iso = pd.DatetimeIndex(dates).isocalendar()
+    return pd.DataFrame({
+        'date': dates.astype('datetime64[ns]'),
+        'day_of_week_name': np.array(DAY_NAMES, dtype=object)[(ordinals + 3) % 7],
+        'week_number': week_index(ordinals),
+        'iso_year': iso['year'].to_numpy(dtype=np.int64),
+        'iso_week': iso['week'].to_numpy(dtype=np.int64),
+    })
+
+
+class CalendarIndex:
+    """
+    Calendar lookups keyed by day ordinal, built once from calendar_df.
+    Holds the weekday, week number and days remaining in the week for every day in the calendar range.
+    """
+
+    def __init__(self, calendar_df):
+        calendar = calendar_df.rename(columns={'Date': 'date'})[['date', 'day_of_week_name', 'week_number']].copy()
+        calendar['date'] = pd.to_datetime(calendar['date'])
+        # days left counts later calendar dates with the same week number
+        calendar['days_left'] = calendar.groupby('week_number')['date'].rank(method='min', ascending=False) - 1
+        # the first calendar row wins when a date appears more than once
+        calendar = calendar.drop_duplicates('date', keep='first')
+
+        ordinals = day_ordinals(calendar['date'])
+        self.first_ordinal = int(ordinals.min()) if len(ordinals) else 0
+        size = int(ordinals.max()) - self.first_ordinal + 1 if len(ordinals) else 0
+        offsets = ordinals - self.first_ordinal
+
+        self.known = np.zeros(size, dtype=bool)
+        self.known[offsets] = True
+        self.weekday = np.full(size, -1, dtype=np.int8)
+        self.weekday[offsets] = calendar['day_of_week_name'].map({name: i for i, name in enumerate(DAY_NAMES)}) \
+            .fillna(-1).to_numpy(dtype=np.int8)
+        self.week = np.full(size, np.nan)
+        self.week[offsets] = calendar['week_number'].to_numpy(dtype=float)
+        self.days_left = np.zeros(size, dtype=np.int64)
+        self.days_left[offsets] = calendar['days_left'].to_numpy(dtype=np.int64)
+
+    @classmethod
+    def from_range(cls, start, end):
+        """Index over every day from start to end inclusive, computed directly from the ordinals"""
+        index = cls.__new__(cls)
+        first, last = (int(o) for o in day_ordinals([start, end]))
+        ordinals = np.arange(first, last + 1, dtype=np.int64)
+        index.first_ordinal = first
+        index.known = np.ones(len(ordinals), dtype=bool)
+        index.weekday = ((ordinals + 3) % 7).astype(np.int8)
+        index.week = week_index(ordinals).astype(float)
+        # days to the Sunday, also when the range ends mid-week: the rest of the week is still to come
+        index.days_left = (6 - index.weekday).astype(np.int64)
+        return index
+
+    def offsets(self, dates):
+        """Array positions for a vector of dates; raises KeyError for dates outside the calendar"""
+        offsets = day_ordinals(dates) - self.first_ordinal
+        inside = (offsets >= 0) & (offsets < len(self.known))
+        if not inside.all() or not self.known[offsets].all():
+            raise KeyError('Dates missing from calendar')
+        return offsets
+
+    def _offset(self, date):
+        offset = int(pd.Timestamp(date).to_datetime64().astype('datetime64[D]').astype(np.int64)) - self.first_ordinal
+        if offset < 0 or offset >= len(self.known) or not self.known[offset]:
+            raise KeyError(f'Date {date} missing from calendar')
+        return offset
+
+    def get_day_of_week(self, date):
+        code = self.weekday[self._offset(date)]
+        return DAY_NAMES[code] if code >= 0 else None
+
+    def get_week_number(self, date):
+        return self.week[self._offset(date)]
+
+    def days_left_in_week(self, date):
+        return int(self.days_left[self._offset(date)])
+
+    # batch lookups over whole date vectors
+    def weekdays(self, dates):
+        return self.weekday[self.offsets(dates)]
+
+    def is_weekday(self, dates):
+        weekday = self.weekdays(dates)
+        return (weekday >= 0) & (weekday < 5)
+
+    def week_numbers(self, dates):
+        return self.week[self.offsets(dates)]
+
+    def days_left_in_weeks(self, dates):
+        return self.days_left[self.offsets(dates)]
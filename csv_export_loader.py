@@ -0,0 +1,71 @@
+import re
+
+import pandas as pd
+
+# Notion writes dates like "10 October 2025" in CSV exports
+EXPORT_DATE_FORMAT = '%d %B %Y'
+EXPORT_ENCODING = 'utf-8-sig'
+YES_NO = {'Yes', 'No'}
+NUMBER_PATTERN = re.compile(r'^-?(\d{1,3}(,\d{3})+|\d+)?(\.\d+)?$')
+
+# rows read to decide the type of every column when none are given
+SAMPLE_ROWS = 1000
+
+
+def infer_export_dtypes(path, date_columns=('Date',), sample_rows=SAMPLE_ROWS):
+    """Split the export columns into Yes/No and numeric columns from a sample of rows"""
+    sample = pd.read_csv(path, encoding=EXPORT_ENCODING, dtype=str, nrows=sample_rows)
+    bool_columns, number_columns = [], []
+    for column in sample.columns:
+        if column in date_columns:
+            continue
+        values = sample[column].dropna()
+        if values.empty:
+            continue
+        if set(values.unique()) <= YES_NO:
+            bool_columns.append(column)
+        elif values.map(lambda v: bool(NUMBER_PATTERN.match(v)) and v not in ['', '-', '.']).all():
+            number_columns.append(column)
+    return bool_columns, number_columns
+
+
+def _typed_chunk(chunk, date_columns, date_format, bool_columns):
+    for column in date_columns:
+        if column in chunk.columns:
+            chunk[column] = pd.to_datetime(chunk[column], format=date_format)
+    for column in bool_columns:
+        chunk[column] = chunk[column].fillna(False).astype(bool)
+    return chunk
+
+
+def iter_notion_export(path, chunksize=50000, date_columns=('Date',), date_format=EXPORT_DATE_FORMAT,
+                       bool_columns=None, number_columns=None):
+    """
+    Read a Notion CSV export in chunks with explicit dtypes:
+    Yes/No as bool, numbers with thousands separators as float and dates with a fixed format.
+    Columns are typed from a sample of rows unless bool_columns / number_columns are given.
+    """
+    if bool_columns is None or number_columns is None:
+        inferred_bool, inferred_number = infer_export_dtypes(path, date_columns)
+        bool_columns = inferred_bool if bool_columns is None else bool_columns
+        number_columns = inferred_number if number_columns is None else number_columns
+
+    header = pd.read_csv(path, encoding=EXPORT_ENCODING, nrows=0).columns
+    dtypes = {column: str for column in header}
+    dtypes.update({column: 'boolean' for column in bool_columns})
+    dtypes.update({column: 'float64' for column in number_columns})
+
+    reader = pd.read_csv(path, encoding=EXPORT_ENCODING, dtype=dtypes, thousands=',',
+                         true_values=['Yes'], false_values=['No'], chunksize=chunksize)
+    for chunk in reader:
+        yield _typed_chunk(chunk, date_columns, date_format, bool_columns)
+
+
+def read_notion_export(path, chunksize=None, date_columns=('Date',), date_format=EXPORT_DATE_FORMAT,
+                       bool_columns=None, number_columns=None):
+    """Read a whole Notion CSV export; chunksize bounds the rows parsed at a time for very large exports"""
+    chunks = list(iter_notion_export(path, chunksize or 50000, date_columns, date_format, bool_columns,
+                                     number_columns))
+    if not chunks:
+        return pd.DataFrame()
+    return pd.concat(chunks, ignore_index=True)
@@ -0,0 +1,282 @@
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from notion_fixtures import database_object, habits_pages, query_response, tracker_pages
+
+# the largest page size Notion accepts
+MAX_PAGE_SIZE = 100
+
+DATE_CONDITIONS = {
+    'equals': lambda value, target: value is not None and value == target,
+    'before': lambda value, target: value is not None and value < target,
+    'after': lambda value, target: value is not None and value > target,
+    'on_or_before': lambda value, target: value is not None and value <= target,
+    'on_or_after': lambda value, target: value is not None and value >= target,
+    'is_empty': lambda value, target: value is None,
+    'is_not_empty': lambda value, target: value is not None,
+}
+
+
+class FilterError(ValueError):
+    pass
+
+
+def _normalize_id(object_id):
+    return object_id.replace('-', '')
+
+
+def _date_value(page, name):
+    prop = page['properties'].get(name)
+    if prop is None:
+        raise FilterError(f'Could not find property with name or id: {name}')
+    if prop['type'] != 'date':
+        return prop.get(prop['type'])
+    return prop['date']['start'][:10] if prop['date'] else None
+
+
+def page_matches(page, query_filter):
+    """Evaluate the subset of Notion filters the sync code sends: and/or, date, checkbox and timestamps"""
+    if 'and' in query_filter:
+        return all(page_matches(page, f) for f in query_filter['and'])
+    if 'or' in query_filter:
+        return any(page_matches(page, f) for f in query_filter['or'])
+    if 'timestamp' in query_filter:
+        value = page[query_filter['timestamp']]
+        conditions = query_filter[query_filter['timestamp']]
+        return all(DATE_CONDITIONS[c](value, t) for c, t in conditions.items())
+    if 'date' in query_filter:
+        value = _date_value(page, query_filter['property'])
+        conditions = query_filter['date']
+        unknown = set(conditions) - set(DATE_CONDITIONS)
+        if unknown:
+            raise FilterError(f'Unsupported date filter {sorted(unknown)}')
+        return all(DATE_CONDITIONS[c](value, t[:10] if isinstance(t, str) else t) for c, t in conditions.items())
+    if 'checkbox' in query_filter:
+        return page['properties'][query_filter['property']]['checkbox'] == query_filter['checkbox']['equals']
+    raise FilterError(f'Unsupported filter {json.dumps(query_filter)}')
+
+
+def sort_pages(pages, sorts):
+    for sort in reversed(sorts or []):
+        if 'timestamp' in sort:
+            values = [page[sort['timestamp']] for page in pages]
+        else:
+            values = [_date_value(page, sort['property']) for page in pages]
+        present = [(value, page) for value, page in zip(values, pages) if value is not None]
+        present.sort(key=lambda item: item[0], reverse=sort.get('direction') == 'descending')
+        # pages without a value go last in either direction
+        pages = [page for _, page in present] + [page for value, page in zip(values, pages) if value is None]
+    return pages
+
+
+def project(page, property_ids):
+    """Keep only the requested properties, as filter_properties does"""
+    if not property_ids:
+        return page
+    kept = {name: prop for name, prop in page['properties'].items() if prop['id'] in property_ids}
+    return dict(page, properties=kept)
+
+
+class FakeNotion:
+    """
+    In-memory stand-in for the Notion API with databases of generated or recorded pages.
+    latency: seconds added to every response; page_size: cap on the results per response;
+    rate / burst: requests per second allowed before answering 429 with Retry-After;
+    error_rate: share of requests failing with error_status.
+    """
+
+    def __init__(self, databases, latency=0.0, page_size=MAX_PAGE_SIZE, rate=None, burst=3, error_rate=0.0,
+                 error_status=500, seed=0):
+        self.databases = {_normalize_id(db['id']): db for db in databases}
+        self.latency = latency
+        self.page_size = page_size
+        self.rate = rate
+        self.burst = burst
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.stats = {'requests': 0, 'throttled': 0, 'errors': 0, 'bytes': 0}
+
+    @classmethod
+    def generated(cls, days=365, habits=28, seed=0, **options):
+        """A tracker and a habits database built from the synthetic fixtures"""
+        tracker = tracker_pages(days, habits, seed=seed)
+        habit_list = habits_pages(habits, seed=seed)
+        tracker_id = tracker[0]['parent']['database_id'] if tracker else '00000000-0000-0000-0000-000000000001'
+        return cls([
+            dict(database_object(tracker_id, 'Daily Tracking', tracker[0]['properties'] if tracker else {}),
+                 pages=tracker),
+            dict(database_object('00000000-0000-0000-0000-0000000000aa', 'Habits', habit_list[0]['properties']),
+                 pages=habit_list),
+        ], seed=seed, **options)
+
+    @classmethod
+    def recorded(cls, path, **options):
+        """Databases recorded as {"databases": [database object with a "pages" list, ...]}"""
+        with open(path) as f:
+            return cls(json.load(f)['databases'], **options)
+
+    def save(self, path):
+        """Write the databases in the format read by recorded()"""
+        with open(path, 'w') as f:
+            json.dump({'databases': list(self.databases.values())}, f)
+
+    def throttle(self):
+        """Seconds to wait before the next request is allowed, or 0 when it may go through"""
+        if not self.rate:
+            return 0
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            return (1 - self.tokens) / self.rate
+
+    def database(self, object_id):
+        database = self.databases.get(_normalize_id(object_id))
+        if database is None:
+            raise KeyError(object_id)
+        return database
+
+    def query(self, object_id, body, property_ids):
+        pages = self.database(object_id)['pages']
+        if body.get('filter'):
+            pages = [page for page in pages if page_matches(page, body['filter'])]
+        pages = sort_pages(pages, body.get('sorts'))
+        page_size = min(body.get('page_size', MAX_PAGE_SIZE), self.page_size)
+        response = query_response(pages, body.get('start_cursor'), page_size)
+        response['results'] = [project(page, property_ids) for page in response['results']]
+        return response
+
+    def search(self, body):
+        databases = [{key: value for key, value in db.items() if key != 'pages'} for db in self.databases.values()]
+        return query_response(databases, body.get('start_cursor'), min(body.get('page_size', 100), self.page_size))
+
+    def handle(self, method, path, body, params):
+        """(status, json body) for one request"""
+        parts = [part for part in path.split('/') if part]
+        if parts[:1] != ['v1']:
+            return 404, _error(404, 'invalid_request_url', 'Invalid request URL.')
+        parts = parts[1:]
+        try:
+            if method == 'POST' and parts == ['search']:
+                return 200, self.search(body)
+            if len(parts) == 2 and parts[0] in ('databases', 'data_sources') and method == 'GET':
+                database = {key: value for key, value in self.database(parts[1]).items() if key != 'pages'}
+                if parts[0] == 'data_sources':
+                    database = dict(database, object='data_source')
+                return 200, database
+            if len(parts) == 3 and parts[0] in ('databases', 'data_sources') and parts[2] == 'query' \
+                    and method == 'POST':
+                return 200, self.query(parts[1], body, set(params.get('filter_properties', [])))
+        except KeyError as e:
+            return 404, _error(404, 'object_not_found', f'Could not find database with ID: {e.args[0]}.')
+        except FilterError as e:
+            return 400, _error(400, 'validation_error', str(e))
+        return 404, _error(404, 'invalid_request_url', 'Invalid request URL.')
+
+
+def _error(status, code, message):
+    return {"object": "error", "status": status, "code": code, "message": message}
+
+
+class FakeNotionHandler(BaseHTTPRequestHandler):
+    notion = None
+
+    def _respond(self, method):
+        notion = self.notion
+        url = urlparse(self.path)
+        length = int(self.headers.get('Content-Length', 0))
+        body = json.loads(self.rfile.read(length) or b'{}') if length else {}
+        if notion.latency:
+            time.sleep(notion.latency)
+
+        headers = {}
+        wait = notion.throttle()
+        if wait:
+            status, payload = 429, _error(429, 'rate_limited', 'You have been rate limited. Please try again later.')
+            headers['Retry-After'] = f'{wait:.3f}'
+        elif notion.error_rate and notion.random.random() < notion.error_rate:
+            status, payload = notion.error_status, _error(notion.error_status, 'internal_server_error',
+                                                          'Injected error.')
+        else:
+            status, payload = notion.handle(method, url.path, body, parse_qs(url.query))
+
+        data = json.dumps(payload).encode('utf-8')
+        with notion.lock:
+            notion.stats['requests'] += 1
+            notion.stats['throttled'] += int(status == 429)
+            notion.stats['errors'] += int(status not in (200, 429))
+            notion.stats['bytes'] += len(data)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self._respond('GET')
+
+    def do_POST(self):
+        self._respond('POST')
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(notion, host='127.0.0.1', port=0):
+    """HTTP server for a FakeNotion; port 0 picks a free port, see server.server_address"""
+    handler = type('Handler', (FakeNotionHandler,), {'notion': notion})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def start_server(notion, host='127.0.0.1', port=0):
+    """Serve in a background thread and return the server and its base URL for notion_base_url"""
+    server = make_server(notion, host, port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://{server.server_address[0]}:{server.server_address[1]}/v1'
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Local stand-in for the Notion API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8777)
+    parser.add_argument('--fixtures', help='recorded databases JSON instead of generated ones')
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--habits', type=int, default=28)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every response')
+    parser.add_argument('--page-size', type=int, default=MAX_PAGE_SIZE)
+    parser.add_argument('--rate', type=float, help='requests per second before 429 responses')
+    parser.add_argument('--burst', type=int, default=3)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--error-status', type=int, default=500)
+    parser.add_argument('--save', help='write the databases as a fixtures JSON file and exit')
+    options = parser.parse_args()
+
+    settings = dict(latency=options.latency, page_size=options.page_size, rate=options.rate, burst=options.burst,
+                    error_rate=options.error_rate, error_status=options.error_status)
+    if options.fixtures:
+        notion = FakeNotion.recorded(options.fixtures, **settings)
+    else:
+        notion = FakeNotion.generated(options.days, options.habits, **settings)
+    if options.save:
+        notion.save(options.save)
+        raise SystemExit(0)
+
+    server = make_server(notion, options.host, options.port)
+    print(f"Fake Notion API on http://{options.host}:{options.port}/v1")
+    for database_id, database in notion.databases.items():
+        print(f"  {database['title'][0]['plain_text']}: {database_id}")
+    server.serve_forever()
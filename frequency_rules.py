@@ -0,0 +1,84 @@
+import re
+
+PERIODS = ('day', 'week', 'month')
+EXTRA_MODES = ('extra', 'count', 'ignore')
+
+
+class FrequencyRule:
+    """
+    Declarative habit schedule.
+    period: 'day', 'week' or 'month'; count: completions required per period;
+    weekdays: eligible weekdays (0 = Monday) for daily schedules, other days never break the streak;
+    every: for daily schedules, the longest allowed gap in days between completions;
+    extra: completions beyond the requirement go to the 'extra' column, are added to the streak
+    count ('count') or are dropped ('ignore').
+    """
+
+    def __init__(self, period, count=1, weekdays=None, every=1, extra='extra'):
+        if period not in PERIODS:
+            raise ValueError(f'Unknown period {period!r}, expected one of {PERIODS}')
+        if extra not in EXTRA_MODES:
+            raise ValueError(f'Unknown extra mode {extra!r}, expected one of {EXTRA_MODES}')
+        if count < 1 or every < 1:
+            raise ValueError('count and every must be at least 1')
+        if period != 'day' and (weekdays is not None or every != 1):
+            raise ValueError('weekdays and every only apply to daily schedules')
+        if period == 'day' and count != 1:
+            raise ValueError('daily schedules need one completion per day')
+        if weekdays is not None and every != 1:
+            raise ValueError('weekdays cannot be combined with every')
+        self.period = period
+        self.count = count
+        self.weekdays = None if weekdays is None or set(weekdays) == set(range(7)) else tuple(sorted(set(weekdays)))
+        self.every = every
+        self.extra = extra
+
+    def __repr__(self):
+        return (f'FrequencyRule(period={self.period!r}, count={self.count}, weekdays={self.weekdays}, '
+                f'every={self.every}, extra={self.extra!r})')
+
+
+FREQUENCY_RULES = {
+    'Daily': FrequencyRule('day'),
+    'Weekdays': FrequencyRule('day', weekdays=range(5)),
+    'Weekly': FrequencyRule('week'),
+    '3x-a-Week': FrequencyRule('week', count=3),
+    'Every Other Day': FrequencyRule('day', every=2),
+    'Monthly': FrequencyRule('month'),
+}
+
+# frequencies not in the registry that are still understood, e.g. "2x-a-Month" or "Every 3 Days"
+TIMES_PER_PERIOD = re.compile(r'^(\d+)x-a-(Week|Month)$', re.IGNORECASE)
+EVERY_N_DAYS = re.compile(r'^Every (\d+) Days$', re.IGNORECASE)
+
+
+def register_frequency(name, rule):
+    """Add or replace the rule used for a Frequency value"""
+    FREQUENCY_RULES[name] = rule
+
+
+def frequency_rule(habit_freq):
+    """Rule for a Frequency value, or None when the frequency is unknown"""
+    if habit_freq in FREQUENCY_RULES:
+        return FREQUENCY_RULES[habit_freq]
+    if not isinstance(habit_freq, str):
+        return None
+    match = TIMES_PER_PERIOD.match(habit_freq)
+    if match and int(match.group(1)) > 0:
+        return FrequencyRule(match.group(2).lower(), count=int(match.group(1)))
+    match = EVERY_N_DAYS.match(habit_freq)
+    if match and int(match.group(1)) > 0:
+        return FrequencyRule('day', every=int(match.group(1)))
+    return None
+
+
+# unknown frequencies already reported, so each one is only warned about once
+_warned_frequencies = set()
+
+
+def warn_unknown_frequency(habit_freq):
+    """Print a warning the first time a frequency without a rule is seen"""
+    if habit_freq in _warned_frequencies:
+        return
+    _warned_frequencies.add(habit_freq)
+    print(f"Warning: Frequency '{habit_freq}' is not known. Its habits get one streak that never closes.")
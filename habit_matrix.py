@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+
+from calendar_index import day_ordinals
+
+
+class HabitMatrix:
+    """
+    Days x habits completion bitset with a small float32 block for Value habits.
+    Rows are the tracked days in date order, identified by day ordinal; columns are habit ids in habit order.
+    Completion bits are packed eight habits per byte along each day.
+    """
+
+    def __init__(self, ordinals, habits, bits, value_habits=(), values=None):
+        self.ordinals = np.asarray(ordinals, dtype=np.int64)
+        self.habits = list(habits)
+        self.habit_ids = {habit: i for i, habit in enumerate(self.habits)}
+        self.bits = bits
+        self.value_habits = list(value_habits)
+        self.value_ids = {habit: i for i, habit in enumerate(self.value_habits)}
+        self.values = values if values is not None else np.zeros((len(self.ordinals), 0), dtype=np.float32)
+
+    @classmethod
+    def from_frame(cls, daily_habit_tracker_df, habits_df):
+        """Build from a filled tracker frame; habits without a column are never done"""
+        tracker = daily_habit_tracker_df.sort_values('Date', kind='stable')
+        habits = habits_df.drop_duplicates('Short Name')
+        names = list(habits['Short Name'])
+        check_types = dict(zip(habits['Short Name'], habits['Check'])) if 'Check' in habits else {}
+
+        done = np.zeros((len(tracker), len(names)), dtype=bool)
+        value_habits = [h for h in names if check_types.get(h) == 'Value' and h in tracker.columns]
+        values = np.zeros((len(tracker), len(value_habits)), dtype=np.float32)
+        for i, habit in enumerate(names):
+            if habit not in tracker.columns:
+                continue
+            column = tracker[habit]
+            if habit in value_habits:
+                numbers = pd.to_numeric(column, errors='coerce').to_numpy(dtype=np.float32)
+                values[:, value_habits.index(habit)] = np.nan_to_num(numbers)
+                done[:, i] = numbers != 0
+            elif column.dtype == bool:
+                done[:, i] = column.to_numpy()
+            else:
+                done[:, i] = np.array([bool(v) for v in column.to_numpy(dtype=object)], dtype=bool)
+
+        bits = np.packbits(done, axis=1, bitorder='little')
+        return cls(day_ordinals(tracker['Date']), names, bits, value_habits, values)
+
+    def __len__(self):
+        return len(self.ordinals)
+
+    @property
+    def dates(self):
+        return self.ordinals.astype('datetime64[D]').astype('datetime64[ns]')
+
+    @property
+    def nbytes(self):
+        return self.bits.nbytes + self.values.nbytes + self.ordinals.nbytes
+
+    def rows(self, start=None, end=None):
+        """Row slice for an inclusive date range"""
+        lo = 0 if start is None else int(np.searchsorted(self.ordinals, day_ordinals([start])[0], side='left'))
+        hi = len(self) if end is None else int(np.searchsorted(self.ordinals, day_ordinals([end])[0], side='right'))
+        return slice(lo, hi)
+
+    def done(self, habit, start=None, end=None):
+        """Completion of one habit as a bool array over the date range"""
+        habit_id = self.habit_ids[habit]
+        column = self.bits[self.rows(start, end), habit_id >> 3]
+        return ((column >> (habit_id & 7)) & 1).astype(bool)
+
+    def done_matrix(self, start=None, end=None, habits=None):
+        """Unpacked days x habits bool array for a date range and optional habit subset"""
+        block = np.unpackbits(self.bits[self.rows(start, end)], axis=1, count=len(self.habits), bitorder='little')
+        block = block.astype(bool)
+        if habits is not None:
+            block = block[:, [self.habit_ids[h] for h in habits]]
+        return block
+
+    def value(self, habit, start=None, end=None):
+        return self.values[self.rows(start, end), self.value_ids[habit]]
+
+    def slice(self, start=None, end=None):
+        """A new matrix restricted to an inclusive date range, sharing the underlying arrays"""
+        rows = self.rows(start, end)
+        return HabitMatrix(self.ordinals[rows], self.habits, self.bits[rows], self.value_habits, self.values[rows])
@@ -1,8 +1,21 @@
-import requests
+import os
 import pandas as pd
 from datetime import datetime, timedelta
 from configparser import ConfigParser
 import numpy as np
+from calendar_index import CalendarIndex, generate_calendar
+from csv_export_loader import read_notion_export
+from habit_matrix import HabitMatrix
+from notion_discovery_cache import DEFAULT_TTL as DISCOVERY_TTL, DiscoveryCache
+from notion_page_store import NotionPageStore
+from notion_client import API_URL, DEFAULT_RATE, NotionAPIError, shared_client
+from notion_schema import projection_params
+from notion_extract import extract_table_data, stream_table_data
+from notion_partition import DEFAULT_WORKERS, fetch_date_partitioned, iter_result_pages, paginate, read_ahead
+from run_report import RunReport, dump_profile, span, start_profile
+from streak_output import write_habit_facts, write_streak_series, write_streaks
+from streak_checkpoint import (calculate_streaks_incremental, checkpoint_path, load_checkpoint, load_streaks,
+                               save_checkpoint)
 
 def get_config():
     config = ConfigParser()
@@ -11,7 +24,14 @@ def get_config():
 
 config = get_config()
 
-token = config['secret']['token']
+# the token is not needed when running offline from CSV exports
+token = config.get('secret', 'token', fallback='')
+
+NOTION_VERSION = "2022-06-28"
+
+# point at a local stand-in (fake_notion_server.py) for offline load tests
+NOTION_BASE_URL = config.get('resources', 'notion_base_url', fallback=API_URL)
+NOTION_RATE = config.getfloat('resources', 'notion_rate_limit', fallback=DEFAULT_RATE)
 
 payload_dname = {
     "filter": {
@@ -21,68 +41,79 @@ payload_dname = {
     "page_size": 100
 }
 
-headers = {
-    "Authorization": "Bearer " + token,
-    "Notion-Version": "2022-06-28",
-    "Content-Type": "application/json"
-}
-
 class NotionSync:
-    def __init__(self):
-        pass
+    def __init__(self, client=None, discovery_cache=None):
+        # share one pooled, rate limited client per token unless one is given
+        self.client = client
+        # database schemas, fetched once per run
+        self.schemas = {}
+        # optional on-disk list of databases, dropped when a cached database is not found
+        self.discovery_cache = discovery_cache
+
+    def client_for(self, integration_token):
+        if self.client:
+            return self.client
+        return shared_client(integration_token, NOTION_VERSION, NOTION_BASE_URL, NOTION_RATE)
+
+    # request a database, invalidating the discovery cache when Notion no longer knows it
+    def database_request(self, method, path, payload=None, params=None, integration_token=token):
+        try:
+            return self.client_for(integration_token).request(method, path, payload, params)
+        except NotionAPIError as e:
+            if e.status_code == 404 and self.discovery_cache:
+                self.discovery_cache.invalidate()
+            raise
+
+    # post function for a database query, as used by the pagination helpers
+    def database_query(self, database_id, integration_token=token, projection=None):
+        return lambda payload: self.database_request("POST", f"/databases/{database_id}/query", payload, projection,
+                                                     integration_token)
 
     # search database name
-    def  notion_search(self,integration_token = token):
-        url = "https://api.notion.com/v1/search"
-        results = []
-        next_cursor = None
-
-        while True:
-            if next_cursor:
-                payload_dname["start_cursor"] = next_cursor
-
-            response = requests.post(url, json=payload_dname, headers=headers)
-
-            if response.status_code != 200:
-                return 'Error: ' + str(response.status_code)
-                exit(0)
-            else:
-                response_json = response.json()
-                results.extend(response_json["results"])
-                next_cursor = response_json.get("next_cursor")
+    def notion_search(self, integration_token=token):
+        client = self.client_for(integration_token)
+        results = paginate(lambda payload: client.post("/search", payload), payload_dname)
+        return {"results": results}
 
-            if not next_cursor:
-                break
+    # database schema (property names, ids and types)
+    def notion_db_schema(self, database_id, integration_token=token):
+        if database_id not in self.schemas:
+            self.schemas[database_id] = self.database_request("GET", f"/databases/{database_id}",
+                                                              integration_token=integration_token)["properties"]
+        return self.schemas[database_id]
 
-        return {"results": results}
+    # query params so only the required properties are downloaded, resolved from the schema
+    def notion_db_projection(self, database_id, include=None, exclude=None, integration_token=token):
+        if include is None and not exclude:
+            return None
+        return projection_params(self.notion_db_schema(database_id, integration_token), include, exclude)
 
     # query database details
-    def notion_db_details(self, database_id, integration_token=token):
-        url = f"https://api.notion.com/v1/databases/{database_id}/query"
-        results = []
-        next_cursor = None
-
-        while True:
-            if next_cursor:
-                payload = {"start_cursor": next_cursor}
-            else:
-                payload = {}
-
-            response = requests.post(url, json=payload, headers=headers)
-
-            if response.status_code != 200:
-                return 'Error: ' + str(response.status_code)
-                exit(0)
-            else:
-                response_json = response.json()
-                results.extend(response_json["results"])
-                next_cursor = response_json.get("next_cursor")
-
-            if not next_cursor:
-                break
-
+    def notion_db_details(self, database_id, integration_token=token, query_filter=None, projection=None):
+        payload = {"filter": query_filter} if query_filter else {}
+        results = paginate(self.database_query(database_id, integration_token, projection), payload)
         return {"results": results}
 
+    # query only pages edited since the last sync, merge them into the page store and return all stored pages
+    def notion_db_details_incremental(self, database_id, page_store, integration_token=token, projection=None):
+        query_filter = page_store.sync_filter(database_id, projection)
+        dbdetails = self.notion_db_details(database_id, integration_token, query_filter=query_filter,
+                                           projection=projection)
+        page_store.merge(database_id, dbdetails["results"], projection, full=query_filter is None)
+        return {"results": page_store.pages(database_id)}
+
+    # query database details by paging through disjoint date ranges concurrently
+    def notion_db_details_partitioned(self, database_id, integration_token=token, date_property='Date', by='month',
+                                      max_workers=DEFAULT_WORKERS, projection=None):
+        return fetch_date_partitioned(self.database_query(database_id, integration_token, projection),
+                                      date_property, by, max_workers)
+
+    # stream database pages into typed columns, decoding each response while the next one is fetched
+    def notion_db_table_data(self, database_id, integration_token=token, projection=None):
+        batches = iter_result_pages(self.database_query(database_id, integration_token, projection), {})
+        builder = stream_table_data(read_ahead(batches))
+        return builder.to_dict() if builder else {}
+
     # to get databases id and name
     def get_databases(self,data_json):
         databaseinfo = {}
@@ -111,268 +142,249 @@ class NotionSync:
             type_data[t] = data_json["results"][0]["properties"][t]["type"]
         return type_data
 
-    # to get table data by column type
+    # to get table data by column type, decoded in one pass into typed columns
     def get_table_data(self,data_json,columns_type):
-        table_data = {}
-        for k, v in columns_type.items():
-            # to check column type and process by type
-            if v in ["checkbox","number","email","phone_number"]:
-                table_data[k] = [ data_json["results"][i]["properties"][k][v]
-                                    if data_json["results"][i]["properties"][k][v]
-                                    else ""
-                                    for i in range(len(data_json["results"]))]
-            elif v == "date":
-                table_data[k] = [ data_json["results"][i]["properties"][k]["date"]["start"]
-                                    if data_json["results"][i]["properties"][k]["date"]
-                                    else ""
-                                    for i in range(len(data_json["results"])) ]
-            elif v == "rich_text" or v == 'title':
-                table_data[k] = [ data_json["results"][i]["properties"][k][v][0]["plain_text"]
-                                    if data_json["results"][i]["properties"][k][v]
-                                    else ""
-                                    for i in range(len(data_json["results"])) ]
-            elif v == "files":
-                table_data[k + "_FileName"] = [ data_json["results"][i]["properties"][k][v][0]["name"]
-                                                if data_json["results"][i]["properties"][k][v]
-                                                else ""
-                                                for i in range(len(data_json["results"])) ]
-                table_data[k + "_FileUrl"] = [ data_json["results"][i]["properties"][k][v][0]["file"]["url"]
-                                           if data_json["results"][i]["properties"][k][v]
-                                                else ""
-                                           for i in range(len(data_json["results"])) ]
-            elif v == "select":
-                table_data[k] = [data_json["results"][i]["properties"][k][v]["name"]
-                                    if data_json["results"][i]["properties"][k][v]
-                                    else ""
-                                    for i in range(len(data_json["results"]))]
-            elif v == "people":
-                table_data[k + "_Name"] = [ [data_json["results"][i]["properties"][k][v][j]["name"]
-                                                if data_json["results"][i]["properties"][k][v]
-                                                # to check if key 'name' exists in the list
-                                                and "name" in data_json["results"][i]["properties"][k][v][j].keys()
-                                                else ""
-                                                for j in range(len(data_json["results"][i]["properties"][k][v]))]
-                                                for i in range(len(data_json["results"])) ]
-            elif v == "multi_select":
-                table_data[k] = [ [data_json["results"][i]["properties"][k][v][j]["name"]
-                                  if data_json["results"][i]["properties"][k][v]
-                                  else ""
-                                  for j in range(len(data_json["results"][i]["properties"][k][v]))]
-                                  for i in range(len(data_json["results"])) 
-                                ]
-
-        return table_data    
+        return extract_table_data(data_json["results"], columns_type)
 
 def fill_missing_habit_data(daily_habit_tracker_df, habits_df):
-    # Iterate over each habit (column) in the habits_df
-    for habit in habits_df['Short Name']:
-        # Check if the habit exists in the daily_habit_tracker_df
-        if habit in daily_habit_tracker_df.columns:
-            # Retrieve the corresponding 'Check' value for the habit
-            check_property = habits_df.loc[habits_df['Short Name'] == habit, 'Check'].values[0]
-            
-            # Replace NaN values and empty strings based on the 'Check' value
-            if check_property == 'Check':
-                daily_habit_tracker_df[habit] = daily_habit_tracker_df[habit].replace(['', None], np.nan).fillna(False)
-            elif check_property == 'Value':
-                daily_habit_tracker_df[habit] = daily_habit_tracker_df[habit].replace(['', None], np.nan).fillna(0)
-        else:
-            print(f"Warning: Habit '{habit}' not found in daily_habit_tracker_df. Skipping.")
-    
-    return daily_habit_tracker_df
+    # Map each habit to its 'Check' value once, the first row wins for duplicated names
+    check_types = habits_df.drop_duplicates('Short Name').set_index('Short Name')['Check']
 
-if __name__=='__main__':
-    nsync = NotionSync()
+    # Report habits missing from the tracker in one pass
+    missing = [habit for habit in check_types.index if habit not in daily_habit_tracker_df.columns]
+    for habit in missing:
+        print(f"Warning: Habit '{habit}' not found in daily_habit_tracker_df. Skipping.")
 
-    # to search all databases.
-    data = nsync.notion_search()
+    present = check_types.drop(missing)
+    check_habits = list(present.index[present == 'Check'])
+    value_habits = list(present.index[present == 'Value'])
 
-    # to get database id and name.
-    dbid_name = nsync.get_databases(data)
+    # Check habits become one bool block, empty and missing cells are False
+    if check_habits:
+        checks = daily_habit_tracker_df[check_habits].replace(['', None], np.nan).astype(object)
+        daily_habit_tracker_df[check_habits] = checks.where(checks.notna(), False).astype(bool)
 
-    #convert dictionary to dataframe.
-    df = pd.DataFrame.from_dict(dbid_name)
+    # Value habits become one float32 block, empty and missing cells are zero
+    if value_habits:
+        values = daily_habit_tracker_df[value_habits].replace(['', None], np.nan)
+        daily_habit_tracker_df[value_habits] = values.apply(pd.to_numeric, errors='coerce').fillna(0).astype(np.float32)
 
-    # convert to bool and then drop record with empty databasae name.
-    df = df[df['database_name'].astype(bool)]
-    
-    # required dataframes for streaks
+    return daily_habit_tracker_df
+
+# Columns to drop, excluded from the tracker query so they are never downloaded
+columns_to_drop = ['CC Balance Value', 'Focus Time (Mins)', 'Improvements', 'Lunch Feedback', 'Name', 'Status', 'Trees Died']
+
+def fetch_table(nsync, database_id, projection=None, page_store=None, fetch_partition=None,
+                fetch_workers=DEFAULT_WORKERS, report=None, table='table'):
+    # notion given another API to get the details of databases by database id. search API does not return databases details.
+    with span(report, f'fetch_{table}') as stage:
+        if page_store:
+            dbdetails = nsync.notion_db_details_incremental(database_id, page_store, projection=projection)
+        elif fetch_partition:
+            dbdetails = nsync.notion_db_details_partitioned(database_id, by=fetch_partition,
+                                                            max_workers=fetch_workers, projection=projection)
+        else:
+            # stream the table page by page straight into typed columns, decoding is part of the fetch
+            table_data = nsync.notion_db_table_data(database_id, projection=projection)
+            stage['rows'] = len(next(iter(table_data.values()), []))
+            return table_data
+        stage['rows'] = len(dbdetails["results"])
+
+    with span(report, f'extract_{table}') as stage:
+        # get column title
+        columns_title = nsync.get_tablecol_titles(dbdetails)
+
+        # get column type
+        columns_type = nsync.get_tablecol_type(dbdetails,columns_title)
+
+        # get table data
+        stage['rows'] = len(dbdetails["results"])
+        return nsync.get_table_data(dbdetails,columns_type)
+
+# fetch the tracker and habits tables; tables missing from database_ids (when given) stay empty
+def fetch_tracker_tables(nsync, tracker_id, habits_id, database_ids=None, page_store=None, fetch_partition=None,
+                         fetch_workers=DEFAULT_WORKERS, report=None):
     daily_habit_tracker_df = pd.DataFrame()
     habits_df = pd.DataFrame()
-    
-    # required dataframes for streaks when testing
-    # daily_habit_tracker_df = pd.read_csv(config['resources']['daily_habit_tracker_file'])
-    # habits_df = pd.read_csv(config['resources']['habits_file'])
-
-    # to loop through database id and get the database details.
-    for d in dbid_name["database_id"]:
-        
-        if d == config['tables']['daily_habit_tracker'] or d == config['tables']['habits']:
-            # notion given another API to get the details of databases by database id. search API does not return databases details.
-            dbdetails = nsync.notion_db_details(d)
-            # get column title
-            columns_title = nsync.get_tablecol_titles(dbdetails)
-
-            # get column type
-            columns_type = nsync.get_tablecol_type(dbdetails,columns_title)
-
-            # get table data
-            table_data = nsync.get_table_data(dbdetails,columns_type)
-            
-            if d == config['tables']['daily_habit_tracker']:
-                daily_habit_tracker_df = pd.DataFrame.from_dict(table_data)
-            elif d == config['tables']['habits']:
-                habits_df = pd.DataFrame.from_dict(table_data)
-
-    # Columns to drop
-    columns_to_drop = ['CC Balance Value', 'Focus Time (Mins)', 'Improvements', 'Lunch Feedback', 'Name', 'Status', 'Trees Died']
-    daily_habit_tracker_df = daily_habit_tracker_df.drop(columns=columns_to_drop)
-    
-    calendar_df = pd.read_csv(config['resources']['calendar_file'])
-
-    # Convert date columns to datetime
-    daily_habit_tracker_df['Date'] = pd.to_datetime(daily_habit_tracker_df['Date'])
-    calendar_df['date'] = pd.to_datetime(calendar_df['date'])
 
-    # Rename 'date' column in calendar_df to 'Date' for merging purposes
-    calendar_df = calendar_df.rename(columns={'date': 'Date'})
+    if database_ids is None or tracker_id in database_ids:
+        # only download the tracker columns the streak calculation uses
+        with span(report, 'schema_tracker'):
+            projection = nsync.notion_db_projection(tracker_id, exclude=columns_to_drop)
+        daily_habit_tracker_df = pd.DataFrame.from_dict(fetch_table(
+            nsync, tracker_id, projection, page_store, fetch_partition, fetch_workers, report, 'tracker'))
+
+    if database_ids is None or habits_id in database_ids:
+        habits_df = pd.DataFrame.from_dict(fetch_table(nsync, habits_id, page_store=page_store, report=report,
+                                                       table='habits'))
+
+    return daily_habit_tracker_df, habits_df
+
+# join the tracker onto the calendar, fill missing values and keep 2025 onwards; returns the tracker and calendar index
+def prepare_tracker(daily_habit_tracker_df, habits_df, calendar_file=None, calendar_start=None, calendar_end=None,
+                    report=None):
+    with span(report, 'calendar') as stage:
+        # Drop any excluded columns that were still downloaded
+        daily_habit_tracker_df = daily_habit_tracker_df.drop(columns=columns_to_drop, errors='ignore')
+
+        # Convert date columns to datetime
+        daily_habit_tracker_df['Date'] = pd.to_datetime(daily_habit_tracker_df['Date'])
+
+        if calendar_file:
+            calendar_df = pd.read_csv(calendar_file)
+            calendar_df['date'] = pd.to_datetime(calendar_df['date'])
+            calendar_index = CalendarIndex(calendar_df)
+        else:
+            # Generate the calendar in memory over the tracked range, weeks numbered continuously across years
+            calendar_start = calendar_start or daily_habit_tracker_df['Date'].min()
+            calendar_end = calendar_end or daily_habit_tracker_df['Date'].max()
+            calendar_df = generate_calendar(calendar_start, calendar_end)
+            calendar_index = CalendarIndex.from_range(calendar_start, calendar_end)
+        stage['rows'] = len(calendar_df)
 
-    # Merge the two dataframes on 'Date', ensuring all dates from calendar_df are included
-    merged_df = pd.merge(calendar_df, daily_habit_tracker_df, on='Date', how='left')
+    with span(report, 'calendar_merge') as stage:
+        # Rename 'date' column in calendar_df to 'Date' for merging purposes
+        calendar_df = calendar_df.rename(columns={'date': 'Date'})
 
-    # Drop calendar-specific columns from the merged dataframe if they are not needed
-    columns_to_drop = [col for col in calendar_df.columns if col != 'Date']
-    merged_df = merged_df.drop(columns=columns_to_drop)
+        # Merge the two dataframes on 'Date', ensuring all dates from calendar_df are included
+        merged_df = pd.merge(calendar_df, daily_habit_tracker_df, on='Date', how='left')
 
-    # Sort the merged dataframe by 'Date'
-    merged_df = merged_df.sort_values(by='Date')
+        # Drop calendar-specific columns from the merged dataframe if they are not needed
+        calendar_columns = [col for col in calendar_df.columns if col != 'Date']
+        merged_df = merged_df.drop(columns=calendar_columns)
 
-    # Replace daily_habit_tracker_df with the newly merged dataframe
-    daily_habit_tracker_df = merged_df
+        # Sort the merged dataframe by 'Date'
+        merged_df = merged_df.sort_values(by='Date')
 
-    # Replace NaN values with False or zero depending on check property
-    daily_habit_tracker_df = fill_missing_habit_data(daily_habit_tracker_df, habits_df)
+        # Replace daily_habit_tracker_df with the newly merged dataframe
+        daily_habit_tracker_df = merged_df
+        stage['rows'] = len(merged_df)
 
-    # Rename 'Date' column in calendar_df to 'date' after merge is done
-    calendar_df = calendar_df.rename(columns={'Date': 'date'})
+    with span(report, 'fill_missing_habit_data') as stage:
+        # Replace NaN values with False or zero depending on check property
+        daily_habit_tracker_df = fill_missing_habit_data(daily_habit_tracker_df, habits_df)
+        stage['rows'] = len(daily_habit_tracker_df)
 
     # Filter daily habit tracker dataframe to only have rows from 2025 onwards
     print("Number of rows in the daily habit tracker data frame before filter: ", len(daily_habit_tracker_df))
     daily_habit_tracker_df = daily_habit_tracker_df[daily_habit_tracker_df['Date'] >= '2025-01-01']
     print("Number of rows in the daily habit tracker data frame after filter: ", len(daily_habit_tracker_df))
-    
-    # Initialize the streaks dataframe
-    streaks_df = pd.DataFrame(columns=['id', 'name', 'start_date', 'end_date', 'streak_count', 'extra', 'active'])
-    streak_id = 1
-
-    # Helper function to get the day of the week
-    def get_day_of_week(date):
-        return calendar_df.loc[calendar_df['date'] == date, 'day_of_week_name'].values[0]
-
-    # Helper function to get the week number
-    def get_week_number(date):
-        return calendar_df.loc[calendar_df['date'] == date, 'week_number'].values[0]
-
-    # Helper function to get the number of days left in the week
-    def days_left_in_week(calendar_df, current_week_num, current_date):
-        # Filter the calendar_df to get the dates in the current week
-        current_week_dates = calendar_df[calendar_df['week_number'] == current_week_num]
-        
-        # Filter out dates that are before the current_date
-        remaining_dates = current_week_dates[current_week_dates['date'] > current_date]
-        
-        # Return the number of remaining dates
-        return len(remaining_dates)
-    
-    # Process each date in the daily habit tracker
-    for index, row in daily_habit_tracker_df.iterrows():
-        current_date = row['Date']
-        for habit in habits_df['Short Name']:
-            habit_freq = habits_df.loc[habits_df['Short Name'] == habit, 'Frequency'].values[0]
-            habit_done = row.get(habit, None)  # Use .get() to handle missing columns
-            
-            # Check for active streak
-            active_streak = streaks_df[(streaks_df['name'] == habit) & (streaks_df['active'] == True)]
-            
-            if habit_done:  # Habit completed
-                if not active_streak.empty: # Active streak exists
-                    active_streak_index = active_streak.index[0]
-                    if habit_freq == 'Daily':
-                        streaks_df.at[active_streak_index, 'streak_count'] += 1
-                        streaks_df.at[active_streak_index, 'end_date'] = current_date
-                    elif habit_freq == 'Weekdays':
-                        if get_day_of_week(current_date) in ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']:
-                            streaks_df.at[active_streak_index, 'streak_count'] += 1
-                            streaks_df.at[active_streak_index, 'end_date'] = current_date
-                        else:
-                            streaks_df.at[active_streak_index, 'extra'] += 1
-                    elif habit_freq == 'Weekly':
-                        streak_end_week = get_week_number(streaks_df.at[active_streak_index, 'end_date'])
-                        current_week = get_week_number(current_date)
-                        if current_week == streak_end_week:
-                            streaks_df.at[active_streak_index, 'extra'] += 1
-                        elif current_week == streak_end_week + 1:
-                            streaks_df.at[active_streak_index, 'streak_count'] += 1
-                            streaks_df.at[active_streak_index, 'end_date'] = current_date
-                    elif habit_freq == '3x-a-Week':
-                        current_week_num = get_week_number(current_date)
-                        streak_end_week_num = get_week_number(streaks_df.at[active_streak_index, 'end_date'])
-                        streak_start_week_num = get_week_number(streaks_df.at[active_streak_index, 'start_date'])
-                        streak_count = streaks_df.at[active_streak_index, 'streak_count']
-                        
-                        target_count = ((current_week_num - streak_start_week_num) + 1 ) * 3
-                        if streak_count < target_count:
-                            streaks_df.at[active_streak_index, 'streak_count'] += 1
-                            streaks_df.at[active_streak_index, 'end_date'] = current_date
-                        elif streak_count == target_count:
-                            streaks_df.at[active_streak_index, 'extra'] += 1
-                        
-                        
-                else: # No active streak exists
-                    streak_count = 1
-                    extra_count = 0
-
-                    if habit_freq == 'Weekdays':
-                        if get_day_of_week(current_date) in ['Saturday', 'Sunday']:
-                            streak_count = 0
-                            extra_count = 1
-
-                    new_streak = {
-                        'id': streak_id,
-                        'name': habit,
-                        'start_date': current_date,
-                        'end_date': current_date,
-                        'streak_count': streak_count,
-                        'extra': extra_count,
-                        'active': True
-                    }
-                    new_streak_df = pd.DataFrame([new_streak])
-                    streaks_df = pd.concat([streaks_df, new_streak_df], ignore_index=True)
-                    streak_id += 1
-            elif habit_done == False or pd.isna(habit_done):  # Habit not completed or is NaN/empty
-                if not active_streak.empty: # Active streak exists
-                    active_streak_index = active_streak.index[0]
-                    if habit_freq == 'Daily':
-                        streaks_df.at[active_streak_index, 'active'] = False
-                    elif habit_freq == 'Weekdays':
-                        if get_day_of_week(current_date) in ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']:
-                            streaks_df.at[active_streak_index, 'active'] = False
-                    elif habit_freq == 'Weekly':
-                        streak_end_week = get_week_number(streaks_df.at[active_streak_index, 'end_date'])
-                        current_week = get_week_number(current_date)
-                        if current_week >= streak_end_week + 2:
-                            streaks_df.at[active_streak_index, 'active'] = False
-                    elif habit_freq == '3x-a-Week':
-                        current_week_num = get_week_number(current_date)
-                        streak_end_week_num = get_week_number(streaks_df.at[active_streak_index, 'end_date'])
-                        streak_start_week_num = get_week_number(streaks_df.at[active_streak_index, 'start_date'])
-                        streak_count = streaks_df.at[active_streak_index, 'streak_count']
-
-                        target_count = ((current_week_num - streak_start_week_num) + 1 ) * 3
-                        days_left_num = days_left_in_week(calendar_df, current_week_num, current_date)
-
-                        if streak_count + days_left_num < target_count:
-                            streaks_df.at[active_streak_index, 'active'] = False
-                        
-    # Save the streaks dataframe to a CSV file
-    streaks_df.to_csv(config['resources']['streaks_file'], index=False)
\ No newline at end of file
+
+    return daily_habit_tracker_df, calendar_index
+
+# calculate streaks from the prepared tracker, reusing the previous output, and write every requested output
+def run_streaks(daily_habit_tracker_df, habits_df, calendar_index, streaks_file, checkpoint_file=None,
+                streak_series_file=None, streaks_parquet_file=None, habit_facts_file=None, report=None):
+    with span(report, 'habit_matrix') as stage:
+        # Pack the habit completions into a days x habits bitset for the streak engine
+        habit_matrix = HabitMatrix.from_frame(daily_habit_tracker_df, habits_df)
+        stage['rows'] = len(daily_habit_tracker_df)
+
+    with span(report, 'calculate_streaks') as stage:
+        # Load the previous output and checkpoint so only days after the first change are replayed
+        checkpoint_file = checkpoint_file or checkpoint_path(streaks_file)
+        checkpoint = load_checkpoint(checkpoint_file)
+        previous_streaks_df = load_streaks(streaks_file)
+
+        # Calculate streaks for every habit column at once, with the per-day series when it is written
+        if streak_series_file:
+            streaks_df, checkpoint, series_df = calculate_streaks_incremental(
+                habit_matrix, habits_df, calendar_index, previous_streaks_df, checkpoint, series=True)
+        else:
+            streaks_df, checkpoint = calculate_streaks_incremental(habit_matrix, habits_df, calendar_index,
+                                                                   previous_streaks_df, checkpoint)
+        stage['rows'] = len(streaks_df)
+
+    with span(report, 'write_outputs') as stage:
+        if streak_series_file:
+            write_streak_series(series_df, streak_series_file)
+
+        # Save the streaks dataframe to a CSV file, then the checkpoint describing it.
+        # The file is replaced atomically so the query service never reads a partial file
+        streaks_df.to_csv(streaks_file + '.tmp', index=False)
+        os.replace(streaks_file + '.tmp', streaks_file)
+        save_checkpoint(checkpoint, checkpoint_file)
+
+        # Optional typed Parquet / Arrow outputs for Power BI: streaks and the unpivoted habit facts
+        if streaks_parquet_file:
+            write_streaks(streaks_df, streaks_parquet_file)
+        if habit_facts_file:
+            write_habit_facts(daily_habit_tracker_df, habits_df, habit_facts_file)
+        stage['rows'] = len(streaks_df)
+
+    return streaks_df
+
+if __name__=='__main__':
+    # optional run report with the time, Notion traffic, rows and memory peak of every stage
+    run_report_file = config.get('resources', 'run_report_file', fallback=None)
+    report = RunReport('main', memory=config.getboolean('resources', 'run_report_memory', fallback=True)
+                       ) if run_report_file else None
+
+    # optional cProfile dump of the whole run
+    profile_file = config.get('resources', 'profile_file', fallback=None)
+    profiler = start_profile(profile_file)
+
+    # offline mode: read Notion CSV exports of both tables instead of calling the API
+    daily_habit_tracker_export = config.get('resources', 'daily_habit_tracker_export', fallback=None)
+
+    if daily_habit_tracker_export:
+        with span(report, 'read_exports') as stage:
+            daily_habit_tracker_df = read_notion_export(daily_habit_tracker_export)
+            habits_df = read_notion_export(config['resources']['habits_export'])
+            stage['rows'] = len(daily_habit_tracker_df)
+    else:
+        # optional cache of the workspace search, skipped while it still knows both configured tables
+        discovery_cache_file = config.get('resources', 'discovery_cache_file', fallback=None)
+        discovery_cache = DiscoveryCache(
+            discovery_cache_file, config.getfloat('resources', 'discovery_cache_ttl', fallback=DISCOVERY_TTL)
+        ) if discovery_cache_file else None
+
+        nsync = NotionSync(discovery_cache=discovery_cache)
+        if report:
+            report.client = nsync.client_for(token)
+
+        required_ids = [config['tables']['daily_habit_tracker'], config['tables']['habits']]
+        with span(report, 'search') as stage:
+            dbid_name = discovery_cache.databases(required_ids) if discovery_cache else None
+
+            if dbid_name is None:
+                # to search all databases.
+                data = nsync.notion_search()
+
+                # to get database id and name.
+                dbid_name = nsync.get_databases(data)
+                if discovery_cache:
+                    discovery_cache.save(dbid_name)
+            stage['rows'] = len(dbid_name["database_id"])
+
+        # optional local page store so only pages edited since the last run are downloaded
+        page_store_file = config.get('resources', 'page_store_file', fallback=None)
+        page_store = NotionPageStore(page_store_file, config.getfloat(
+            'resources', 'page_store_full_refresh', fallback=None)) if page_store_file else None
+
+        # optional date partitioning ('month' or 'year') to fetch the tracker with concurrent queries
+        fetch_partition = config.get('resources', 'fetch_partition', fallback=None)
+        fetch_workers = config.getint('resources', 'fetch_workers', fallback=DEFAULT_WORKERS)
+
+        # fetch the configured tables that the workspace search found
+        daily_habit_tracker_df, habits_df = fetch_tracker_tables(
+            nsync, config['tables']['daily_habit_tracker'], config['tables']['habits'],
+            database_ids=set(dbid_name["database_id"]), page_store=page_store, fetch_partition=fetch_partition,
+            fetch_workers=fetch_workers, report=report)
+
+    daily_habit_tracker_df, calendar_index = prepare_tracker(
+        daily_habit_tracker_df, habits_df,
+        calendar_file=config.get('resources', 'calendar_file', fallback=None),
+        calendar_start=config.get('resources', 'calendar_start', fallback=None),
+        calendar_end=config.get('resources', 'calendar_end', fallback=None), report=report)
+
+    run_streaks(daily_habit_tracker_df, habits_df, calendar_index, config['resources']['streaks_file'],
+                checkpoint_file=config.get('resources', 'streaks_checkpoint_file', fallback=None),
+                streak_series_file=config.get('resources', 'streak_series_file', fallback=None),
+                streaks_parquet_file=config.get('resources', 'streaks_parquet_file', fallback=None),
+                habit_facts_file=config.get('resources', 'habit_facts_file', fallback=None), report=report)
+
+    dump_profile(profiler, profile_file)
+    if report:
+        report.close()
+        report.write(run_report_file)
@@ -0,0 +1,166 @@
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+API_URL = "https://api.notion.com/v1"
+
+# Notion allows an average of 3 requests per second per integration, with short bursts
+DEFAULT_RATE = 3.0
+DEFAULT_BURST = 3
+DEFAULT_MAX_RETRIES = 5
+RETRY_STATUS_CODES = [429, 500, 502, 503, 504]
+
+
+class NotionAPIError(Exception):
+    """Raised when Notion answers with a non-200 status after all retries"""
+
+    def __init__(self, status_code, text, url):
+        super().__init__(f'Error: {status_code} - {text}')
+        self.status_code = status_code
+        self.text = text
+        self.url = url
+
+
+class TokenBucket:
+    """Thread-safe token bucket; acquire blocks until a request may be sent"""
+
+    def __init__(self, rate=DEFAULT_RATE, capacity=DEFAULT_BURST):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if now >= self.paused_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = max(self.paused_until - now, (1 - self.tokens) / self.rate)
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Hold every caller back, e.g. after a 429 with Retry-After"""
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.tokens = 0
+
+
+class NotionClient:
+    """
+    Notion API client shared by the sync and Power BI code paths.
+    Keeps connections alive in a pooled session, rate limits requests with a token bucket,
+    honors Retry-After and retries 429/5xx responses with jittered exponential backoff.
+    """
+
+    def __init__(self, token, notion_version="2022-06-28", base_url=API_URL, rate=DEFAULT_RATE, burst=DEFAULT_BURST,
+                 max_retries=DEFAULT_MAX_RETRIES, pool_size=10, timeout=60):
+        self.base_url = base_url.rstrip("/")
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.bucket = TokenBucket(rate, burst)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "Authorization": f"Bearer {token}",
+            "Notion-Version": notion_version,
+            "Content-Type": "application/json"
+        })
+
+        # per-request latency counters
+        self.stats_lock = threading.Lock()
+        self.request_count = 0
+        self.retry_count = 0
+        self.error_count = 0
+        self.bytes_received = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def _record(self, latency, retried, failed, size=0):
+        with self.stats_lock:
+            self.request_count += 1
+            self.bytes_received += size
+            self.retry_count += int(retried)
+            self.error_count += int(failed)
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+
+    def stats(self):
+        """Request, retry, response size and latency counters since the client was created"""
+        with self.stats_lock:
+            return {
+                "requests": self.request_count,
+                "retries": self.retry_count,
+                "errors": self.error_count,
+                "bytes": self.bytes_received,
+                "total_latency": self.total_latency,
+                "mean_latency": self.total_latency / self.request_count if self.request_count else 0.0,
+                "max_latency": self.max_latency,
+            }
+
+    def _backoff(self, attempt, response):
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after:
+            try:
+                delay = float(retry_after)
+            except ValueError:
+                delay = 1.0
+            self.bucket.pause(delay)
+            return delay + random.uniform(0, 0.25)
+        return random.uniform(0, min(30.0, 0.5 * 2 ** attempt))
+
+    def request(self, method, path, payload=None, params=None):
+        """Send a request and return the json body, retrying throttled and failed requests"""
+        url = path if path.startswith("http") else self.base_url + path
+        attempt = 0
+        while True:
+            self.bucket.acquire()
+            started = time.perf_counter()
+            try:
+                response = self.session.request(method, url, json=payload, params=params, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                self._record(time.perf_counter() - started, attempt > 0, True)
+                if attempt >= self.max_retries:
+                    raise
+                time.sleep(self._backoff(attempt, None))
+                attempt += 1
+                continue
+
+            failed = response.status_code != 200
+            self._record(time.perf_counter() - started, attempt > 0, failed, len(response.content))
+            if not failed:
+                return response.json()
+            if response.status_code not in RETRY_STATUS_CODES or attempt >= self.max_retries:
+                raise NotionAPIError(response.status_code, response.text, url)
+            time.sleep(self._backoff(attempt, response))
+            attempt += 1
+
+    def get(self, path, params=None):
+        return self.request("GET", path, params=params)
+
+    def post(self, path, payload=None, params=None):
+        return self.request("POST", path, payload=payload or {}, params=params)
+
+
+_shared_clients = {}
+_shared_lock = threading.Lock()
+
+
+def shared_client(token, notion_version="2022-06-28", base_url=API_URL, rate=DEFAULT_RATE):
+    """One client per token and API version, so every caller in the process shares its pool and rate limit"""
+    key = (token, notion_version, base_url, rate)
+    with _shared_lock:
+        if key not in _shared_clients:
+            _shared_clients[key] = NotionClient(token, notion_version, base_url, rate)
+        return _shared_clients[key]
@@ -0,0 +1,51 @@
+import json
+import os
+import time
+
+# seconds the cached database list is trusted before searching the workspace again
+DEFAULT_TTL = 24 * 60 * 60
+
+
+class DiscoveryCache:
+    """
+    Database ids, names and urls found by the Notion search, kept on disk between runs.
+    The list is reused while it is younger than the TTL and still contains every required id;
+    a 404 for a cached database invalidates it so the next run searches again.
+    """
+
+    def __init__(self, path, ttl=DEFAULT_TTL):
+        self.path = path
+        self.ttl = ttl
+
+    def load(self):
+        """Cached database info and the time it was searched, or None when there is no usable cache"""
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path) as f:
+                cached = json.load(f)
+        except ValueError:
+            return None
+        if 'searched_at' not in cached or 'databases' not in cached:
+            return None
+        return cached
+
+    def databases(self, required_ids=()):
+        """Cached database info when it is fresh and knows every required id, otherwise None"""
+        cached = self.load()
+        if cached is None or time.time() - cached['searched_at'] > self.ttl:
+            return None
+        if not set(required_ids) <= set(cached['databases']['database_id']):
+            return None
+        return cached['databases']
+
+    def save(self, databaseinfo):
+        """Store the database info from a search, atomically"""
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'searched_at': time.time(), 'databases': databaseinfo}, f)
+        os.replace(tmp_path, self.path)
+
+    def invalidate(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
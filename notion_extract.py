@@ -0,0 +1,169 @@
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+
+def _first_plain_text(values):
+    return values[0]["plain_text"] if values else ""
+
+
+def _file_name(files):
+    return files[0]["name"] if files else ""
+
+
+def _file_url(files):
+    if not files:
+        return ""
+    if "file" in files[0]:
+        return files[0]["file"]["url"]
+    if "external" in files[0]:
+        return files[0]["external"]["url"]
+    return ""
+
+
+def _formula(formula):
+    if not formula:
+        return None
+    return formula.get(formula["type"])
+
+
+# per property type: (column suffix, buffer kind, decoder of the property value) for each output column
+DECODERS = {
+    "checkbox": [("", "bool", lambda v: bool(v))],
+    "number": [("", "float", lambda v: v if v is not None else 0)],
+    "email": [("", "string", lambda v: v or "")],
+    "phone_number": [("", "string", lambda v: v or "")],
+    "url": [("", "string", lambda v: v or "")],
+    "date": [("", "datetime", lambda v: v["start"] if v else None)],
+    "created_time": [("", "datetime", lambda v: v)],
+    "last_edited_time": [("", "datetime", lambda v: v)],
+    "rich_text": [("", "string", _first_plain_text)],
+    "title": [("", "string", _first_plain_text)],
+    "select": [("", "category", lambda v: v["name"] if v else "")],
+    "status": [("", "category", lambda v: v["name"] if v else "")],
+    "multi_select": [("", "category", lambda v: ", ".join(option["name"] for option in v) if v else "")],
+    "people": [("_Names", "string", lambda v: ", ".join(p["name"] for p in v if "name" in p) if v else "")],
+    "relation": [("_Relations", "string", lambda v: ", ".join(rel["id"] for rel in v) if v else "")],
+    "files": [("_FileName", "string", _file_name), ("_FileUrl", "string", _file_url)],
+    "formula": [("", "object", _formula)],
+}
+
+
+# property types whose payload is a list, so a missing property decodes as an empty list
+LIST_TYPES = ["files", "people", "relation", "multi_select", "rich_text", "title"]
+
+
+def get_column_types(results):
+    """Column name to property type, taken from the first record"""
+    if not results:
+        return {}
+    return {name: prop["type"] for name, prop in results[0]["properties"].items()}
+
+
+def _finish(kind, values):
+    if kind == "bool":
+        return np.array(values, dtype=bool)
+    if kind == "float":
+        return np.array(values, dtype=np.float64)
+    if kind == "datetime":
+        try:
+            return pd.to_datetime(pd.Series(values, dtype=object), format="ISO8601")
+        except (ValueError, TypeError):
+            # mixed offsets, normalise to UTC
+            return pd.to_datetime(pd.Series(values, dtype=object), format="ISO8601", utc=True)
+    if kind == "category":
+        return pd.Categorical(values)
+    if kind == "object":
+        return pd.Series(values, dtype=object).infer_objects()
+    return np.array(values, dtype=object)
+
+
+def _concat(kind, chunks):
+    if not chunks:
+        return _finish(kind, [])
+    if len(chunks) == 1:
+        return chunks[0]
+    if kind == "category":
+        return union_categoricals(chunks)
+    if kind == "datetime":
+        values = pd.concat(chunks, ignore_index=True)
+        # chunks parsed with different offsets, normalise to UTC
+        return values if values.dtype != object else pd.to_datetime(values, utc=True)
+    if kind == "object":
+        return pd.concat(chunks, ignore_index=True).infer_objects()
+    return np.concatenate(chunks)
+
+
+class ColumnBuilder:
+    """
+    Typed column buffers filled from Notion pages.
+    Each page's properties are walked once and every value is decoded by the table entry for its type.
+    flush turns the decoded values into typed chunks, so raw pages can be dropped batch by batch.
+    """
+
+    def __init__(self, columns_type):
+        self.columns_type = columns_type
+        self.columns = []
+        for name, prop_type in columns_type.items():
+            decoders = DECODERS.get(prop_type, [("", "string", str)])
+            # raw decode reads the property's payload key; unknown types are kept as the str() of the property
+            raw = prop_type in DECODERS
+            for suffix, kind, decode in decoders:
+                self.columns.append((name, name + suffix, prop_type, kind, decode, raw))
+        self.buffers = {column: [] for _, column, _, _, _, _ in self.columns}
+        self.chunks = {column: [] for _, column, _, _, _, _ in self.columns}
+        self.row_count = 0
+
+    def add_pages(self, pages):
+        columns = self.columns
+        buffers = self.buffers
+        for page in pages:
+            properties = page["properties"]
+            for name, column, prop_type, kind, decode, raw in columns:
+                prop = properties.get(name)
+                if prop is None:
+                    value = decode([] if prop_type in LIST_TYPES else None) if raw else ""
+                elif raw:
+                    value = decode(prop[prop_type])
+                else:
+                    value = decode(prop)
+                buffers[column].append(value)
+        self.row_count += len(pages)
+
+    def flush(self):
+        for _, column, _, kind, _, _ in self.columns:
+            if self.buffers[column]:
+                self.chunks[column].append(_finish(kind, self.buffers[column]))
+                self.buffers[column] = []
+
+    def to_dict(self):
+        self.flush()
+        return {column: _concat(kind, self.chunks[column]) for _, column, _, kind, _, _ in self.columns}
+
+    def to_frame(self):
+        return pd.DataFrame(self.to_dict())
+
+
+def extract_table_data(results, columns_type=None):
+    """Typed columns for a list of Notion pages"""
+    if columns_type is None:
+        columns_type = get_column_types(results)
+    builder = ColumnBuilder(columns_type)
+    builder.add_pages(results)
+    return builder.to_dict()
+
+
+def stream_table_data(batches, columns_type=None):
+    """
+    Decode batches of pages (one Notion response each) as they arrive.
+    Column types come from the first record unless given; returns None when there are no rows.
+    """
+    builder = None
+    for pages in batches:
+        if not pages:
+            continue
+        if builder is None:
+            builder = ColumnBuilder(columns_type or get_column_types(pages))
+        builder.add_pages(pages)
+        builder.flush()
+    return builder
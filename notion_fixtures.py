@@ -0,0 +1,152 @@
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from calendar_index import generate_calendar
+
+# the tracker columns of the bundled Notion CSV export, with their Notion property types
+CHECKBOX_PROPERTIES = ['Up at 5', 'Pills', 'Meditate', 'Strength Exercise', 'Journal', 'Wallet Balance',
+                       'Bullet Journal', 'Plan', 'CC Balance Check', 'Code', 'Update Finances', 'No Snacks', 'Water',
+                       'No Energy Drink', 'Inbox 0', 'Review', 'Cardio Exercise', 'No Soft Drink', 'No Fap', 'Read',
+                       'Down by 10', 'Planned Meal', 'Weekly Review', 'Shopping List', 'Weekly Learning', 'Motion',
+                       'Weight Check', 'BP Check']
+NUMBER_PROPERTIES = ['CC Balance Value', 'Trees Grown', 'Trees Died', 'Focus Time (Mins)']
+TEXT_PROPERTIES = ['Lunch Feedback', 'Improvements']
+
+FREQUENCIES = ['Daily', 'Daily', 'Daily', 'Weekdays', 'Weekly', '3x-a-Week']
+
+
+def habit_names(habits):
+    """Checkbox habit names: the tracker's own, then numbered extras when more are asked for"""
+    return (CHECKBOX_PROPERTIES + [f'Habit {i}' for i in range(len(CHECKBOX_PROPERTIES), habits)])[:habits]
+
+
+def _text(value):
+    return [{"type": "text", "text": {"content": value}, "plain_text": value}]
+
+
+def _property(prop_id, prop_type, value):
+    return {"id": prop_id, "type": prop_type, prop_type: value}
+
+
+def tracker_pages(days, habits=len(CHECKBOX_PROPERTIES), start='2025-01-01', seed=0, database_id=None):
+    """
+    Query results of a daily tracker database with the property shapes of the bundled export:
+    title, date, a formula weekday, a week relation, one checkbox per habit, numbers, a status and rich text.
+    Identical property values are shared between pages to keep large fixtures small.
+    """
+    rng = np.random.default_rng(seed)
+    database_id = database_id or str(uuid.UUID(int=seed))
+    dates = pd.date_range(start, periods=days, freq='D')
+    names = habit_names(habits)
+    done = rng.random((days, len(names))) < rng.uniform(0.3, 0.9, len(names))
+    numbers = rng.integers(0, 120, (days, len(NUMBER_PROPERTIES)))
+
+    checkbox = {(i, v): _property(f'c{i}', 'checkbox', v) for i in range(len(names)) for v in (False, True)}
+    day_names = {d: _property('day', 'formula', {"type": "string", "string": d}) for d in dates.day_name().unique()}
+    status = {s: _property('status', 'status', {"id": s, "name": s, "color": "default"})
+              for s in ['Active', 'Done']}
+    # each text property keeps its own id, whichever of the shared values it holds
+    texts = {prop_id: [_property(prop_id, 'rich_text', _text('Worked on notes and memos.')),
+                       _property(prop_id, 'rich_text', _text('Capture tasks and meeting notes quickly.')),
+                       _property(prop_id, 'rich_text', [])]
+             for prop_id in ['lf', 'imp']}
+
+    pages = []
+    for row, date in enumerate(dates):
+        iso_date = date.strftime('%Y-%m-%d')
+        week_start = (date - pd.Timedelta(days=date.dayofweek)).strftime('%Y%m%d')
+        properties = {
+            'Name': _property('title', 'title', _text(date.strftime('%d %b %y'))),
+            'Date': _property('date', 'date', {"start": iso_date, "end": None, "time_zone": None}),
+            'Day': day_names[date.day_name()],
+            'Week': _property('week', 'relation', [{"id": f"week-{week_start}"}]),
+        }
+        for i, name in enumerate(names):
+            properties[name] = checkbox[i, bool(done[row, i])]
+        for i, name in enumerate(NUMBER_PROPERTIES):
+            properties[name] = _property(f'n{i}', 'number', int(numbers[row, i]))
+        properties['Status'] = status['Done' if row < days - 7 else 'Active']
+        properties['Lunch Feedback'] = texts['lf'][row % 3]
+        properties['Improvements'] = texts['imp'][(row + 1) % 3]
+        pages.append({
+            "object": "page",
+            "id": str(uuid.UUID(int=(seed << 64) + row + 1)),
+            "created_time": f"{iso_date}T06:00:00.000Z",
+            "last_edited_time": f"{iso_date}T21:00:00.000Z",
+            "archived": False,
+            "in_trash": False,
+            "parent": {"type": "database_id", "database_id": database_id},
+            "properties": properties,
+        })
+    return pages
+
+
+def habits_pages(habits=len(CHECKBOX_PROPERTIES), seed=0):
+    """Query results of the habits database: Short Name, Frequency and Check for every tracker habit"""
+    pages = []
+    for i, name in enumerate(habit_names(habits)):
+        pages.append({
+            "object": "page",
+            "id": str(uuid.UUID(int=(seed << 64) + 10 ** 9 + i)),
+            "last_edited_time": "2025-01-01T00:00:00.000Z",
+            "archived": False,
+            "properties": {
+                'Short Name': _property('title', 'title', _text(name)),
+                'Frequency': _property('freq', 'select', {"name": FREQUENCIES[i % len(FREQUENCIES)]}),
+                'Check': _property('check', 'select', {"name": 'Check'}),
+            },
+        })
+    return pages
+
+
+def database_object(database_id, title, properties):
+    """Database object as returned by GET /databases/{id}, with a single data source"""
+    return {
+        "object": "database",
+        "id": database_id,
+        "title": _text(title),
+        "url": f"https://www.notion.so/{database_id.replace('-', '')}",
+        "properties": {name: {"id": prop["id"], "name": name, "type": prop["type"]}
+                       for name, prop in properties.items()},
+        "data_sources": [{"id": database_id, "name": title}],
+    }
+
+
+def query_response(results, start_cursor=None, page_size=100):
+    """One page of a paginated query response; cursors are offsets into results"""
+    offset = int(start_cursor) if start_cursor else 0
+    end = offset + page_size
+    return {
+        "object": "list",
+        "results": results[offset:end],
+        "next_cursor": str(end) if end < len(results) else None,
+        "has_more": end < len(results),
+        "type": "page_or_database",
+    }
+
+
+def habit_frames(days, habits=len(CHECKBOX_PROPERTIES), start='2025-01-01', seed=0):
+    """
+    Tracker, habits and calendar dataframes as they look after extraction, built directly with numpy
+    so large histories do not go through page dicts. Some days are missing and some cells are empty.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(start, periods=days, freq='D')
+    names = habit_names(habits)
+    kept = rng.random(days) > 0.02
+    tracker = {'Date': dates[kept]}
+    for name in names:
+        column = pd.Series(rng.random(days) < rng.uniform(0.3, 0.9), dtype=object)[kept].reset_index(drop=True)
+        column[rng.random(len(column)) < 0.01] = None
+        tracker[name] = column
+    for name in NUMBER_PROPERTIES:
+        tracker[name] = rng.integers(0, 120, kept.sum()).astype(float)
+
+    habits_df = pd.DataFrame({
+        'Short Name': names + NUMBER_PROPERTIES[1:2],
+        'Frequency': [FREQUENCIES[i % len(FREQUENCIES)] for i in range(len(names))] + ['Daily'],
+        'Check': ['Check'] * len(names) + ['Value'],
+    })
+    return pd.DataFrame(tracker), habits_df, generate_calendar(dates[0], dates[-1])
@@ -0,0 +1,126 @@
+import json
+import sqlite3
+import time
+
+
+def last_edited_filter(since):
+    """Notion query filter for pages edited on or after the given timestamp"""
+    return {
+        "timestamp": "last_edited_time",
+        "last_edited_time": {"on_or_after": since}
+    }
+
+
+def projection_key(projection):
+    """Stable text form of projection query params, empty when every property is fetched"""
+    return json.dumps(projection, sort_keys=True) if projection else ''
+
+
+class NotionPageStore:
+    """
+    Local SQLite copy of Notion pages keyed by page id.
+    Each database (or data source) keeps a sync watermark: the latest last_edited_time merged so far.
+    Notion rounds last_edited_time to the minute, so the next sync queries on_or_after the watermark and
+    pages edited within that minute are fetched again and simply overwritten.
+    Pages moved to the trash are not returned by filtered queries, so sync_filter downloads everything again
+    once the last full download is older than full_refresh_after seconds, or when the property projection
+    the pages were stored with changes.
+    """
+
+    def __init__(self, path, full_refresh_after=None):
+        self.path = path
+        self.full_refresh_after = full_refresh_after
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            "page_id TEXT PRIMARY KEY, database_id TEXT NOT NULL, last_edited_time TEXT NOT NULL, page TEXT NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS pages_database ON pages (database_id)")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS sync_state (database_id TEXT PRIMARY KEY, last_edited_time TEXT NOT NULL)"
+        )
+        # projection the pages were stored with and when they were last downloaded in full
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS sync_meta (database_id TEXT PRIMARY KEY, projection TEXT NOT NULL, "
+            "full_synced_at REAL NOT NULL)"
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def last_synced(self, database_id):
+        """Watermark of the last sync, or None if the database was never synced"""
+        row = self.conn.execute(
+            "SELECT last_edited_time FROM sync_state WHERE database_id = ?", (database_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def query_filter(self, database_id):
+        """Filter to send with the next query, None when everything has to be fetched"""
+        since = self.last_synced(database_id)
+        return last_edited_filter(since) if since else None
+
+    def sync_filter(self, database_id, projection=None):
+        """
+        Filter for the next query of a database fetched with the given projection params.
+        The stored pages are dropped and everything is fetched again (None) when they were stored with
+        another projection, or before this check existed, or when the last full download is too old.
+        """
+        row = self.conn.execute(
+            "SELECT projection, full_synced_at FROM sync_meta WHERE database_id = ?", (database_id,)
+        ).fetchone()
+        expired = (row is not None and self.full_refresh_after is not None
+                   and time.time() - row[1] >= self.full_refresh_after)
+        if row is None or row[0] != projection_key(projection) or expired:
+            self.full_refresh(database_id)
+            return None
+        return self.query_filter(database_id)
+
+    def merge(self, database_id, pages, projection=None, full=False):
+        """
+        Upsert fetched pages, drop archived ones and move the watermark forward.
+        full marks the pages as a complete unfiltered download made with the given projection params.
+        """
+        with self.conn:
+            if full:
+                self.conn.execute(
+                    "INSERT INTO sync_meta (database_id, projection, full_synced_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(database_id) DO UPDATE SET projection = excluded.projection, "
+                    "full_synced_at = excluded.full_synced_at",
+                    (database_id, projection_key(projection), time.time())
+                )
+            live = [p for p in pages if not p.get("archived") and not p.get("in_trash")]
+            gone = [(p["id"],) for p in pages if p.get("archived") or p.get("in_trash")]
+            self.conn.executemany(
+                "INSERT INTO pages (page_id, database_id, last_edited_time, page) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(page_id) DO UPDATE SET database_id = excluded.database_id, "
+                "last_edited_time = excluded.last_edited_time, page = excluded.page",
+                [(p["id"], database_id, p["last_edited_time"], json.dumps(p)) for p in live]
+            )
+            self.conn.executemany("DELETE FROM pages WHERE page_id = ?", gone)
+
+            if pages:
+                watermark = max(p["last_edited_time"] for p in pages)
+                previous = self.last_synced(database_id)
+                if previous is None or watermark > previous:
+                    self.conn.execute(
+                        "INSERT INTO sync_state (database_id, last_edited_time) VALUES (?, ?) "
+                        "ON CONFLICT(database_id) DO UPDATE SET last_edited_time = excluded.last_edited_time",
+                        (database_id, watermark)
+                    )
+        return len(pages)
+
+    def full_refresh(self, database_id):
+        """Forget everything stored for a database so the next sync downloads it again"""
+        with self.conn:
+            self.conn.execute("DELETE FROM pages WHERE database_id = ?", (database_id,))
+            self.conn.execute("DELETE FROM sync_state WHERE database_id = ?", (database_id,))
+            self.conn.execute("DELETE FROM sync_meta WHERE database_id = ?", (database_id,))
+
+    def pages(self, database_id):
+        """All stored pages of a database"""
+        rows = self.conn.execute(
+            "SELECT page FROM pages WHERE database_id = ? ORDER BY last_edited_time DESC", (database_id,)
+        )
+        return [json.loads(row[0]) for row in rows]
@@ -1,16 +1,21 @@
-import requests
 import pandas as pd
 import json
 import configparser
 import os
+from concurrent.futures import ThreadPoolExecutor
+from notion_page_store import NotionPageStore, last_edited_filter
+from notion_client import API_URL, DEFAULT_RATE, NotionAPIError, shared_client
+from notion_extract import stream_table_data
+from notion_snapshot import (DEFAULT_TTL, mark_snapshot_fresh, minute_floor, read_snapshot, snapshot_age,
+                             snapshot_key, snapshot_matches, snapshot_taken_at, utc_now, write_snapshot)
+from notion_schema import projection_params, split_names
+from notion_partition import DEFAULT_WORKERS, fetch_date_partitioned, iter_result_pages, paginate, read_ahead
+from run_report import RunReport, dump_profile, span, start_profile
 
-def fetch_notion_table_data():
-    """
-    Fetch all rows from a specific Notion table for Power BI PowerQuery
-    Reads configuration from config.ini file and uses new Notion API version 2025-09-03
-    """
-    
-    # Load configuration from config.ini
+NOTION_VERSION = "2025-09-03"
+
+def load_config():
+    """Read config.ini from the directory of this script"""
     config = configparser.ConfigParser()
     # Get the directory of the current script
     script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -20,6 +25,23 @@ def fetch_notion_table_data():
         raise FileNotFoundError(f"Config file not found: {config_path}")
     
     config.read(config_path)
+    return config
+
+def connector_client(config, token):
+    """Shared client for the configured API base URL (notion_base_url) and rate limit (notion_rate_limit)"""
+    base_url = config.get('resources', 'notion_base_url', fallback=API_URL)
+    rate = config.getfloat('resources', 'notion_rate_limit', fallback=DEFAULT_RATE)
+    return shared_client(token, NOTION_VERSION, base_url, rate)
+
+def fetch_notion_table_data(include_properties=None, exclude_properties=None):
+    """
+    Fetch all rows from a specific Notion table for Power BI PowerQuery
+    Reads configuration from config.ini file and uses new Notion API version 2025-09-03
+    include_properties / exclude_properties limit the properties Notion sends back
+    """
+    
+    # Load configuration from config.ini
+    config = load_config()
     
     # Read configuration values
     NOTION_TOKEN = config['secret']['token']
@@ -28,12 +50,36 @@ def fetch_notion_table_data():
     # Optional: Allow specific data source ID from config, otherwise auto-discover
     DATA_SOURCE_ID = config.get('tables', 'daily_habit_tracker_data_source', fallback=None)
     
-    # Headers for Notion API with new version
-    headers = {
-        "Authorization": f"Bearer {NOTION_TOKEN}",
-        "Notion-Version": "2025-09-03",
-        "Content-Type": "application/json"
-    }
+    # Optional: Local page store so only pages edited since the last refresh are downloaded
+    PAGE_STORE_FILE = config.get('resources', 'page_store_file', fallback=None)
+    # Optional: Seconds after which the page store is downloaded in full again, dropping deleted pages
+    PAGE_STORE_FULL_REFRESH = config.getfloat('resources', 'page_store_full_refresh', fallback=None)
+    
+    # Optional: Split the query into 'month' or 'year' date ranges fetched concurrently
+    FETCH_PARTITION = config.get('resources', 'fetch_partition', fallback=None)
+    FETCH_WORKERS = config.getint('resources', 'fetch_workers', fallback=DEFAULT_WORKERS)
+    
+    # Optional: Only download these properties (comma separated names in config)
+    if include_properties is None:
+        include_properties = split_names(config.get('resources', 'include_properties', fallback=None))
+    if exclude_properties is None:
+        exclude_properties = split_names(config.get('resources', 'exclude_properties', fallback=None))
+    
+    # Optional: Snapshot file served for snapshot_ttl seconds, or longer while Notion reports no edits
+    SNAPSHOT_FILE = config.get('resources', 'snapshot_file', fallback=None)
+    SNAPSHOT_TTL = config.getfloat('resources', 'snapshot_ttl', fallback=DEFAULT_TTL)
+    # A snapshot only stands in for the same data source and property projection
+    SNAPSHOT_KEY = snapshot_key(DATA_SOURCE_ID or DATABASE_ID, include_properties, exclude_properties)
+    
+    # Shared Notion client with the new API version (pooled connections, rate limiting and retries)
+    client = connector_client(config, NOTION_TOKEN)
+    
+    # Optional: Run report with the time, Notion traffic, rows and memory peak of each stage, and a cProfile dump
+    RUN_REPORT_FILE = config.get('resources', 'run_report_file', fallback=None)
+    report = RunReport('powerbi_connector', client, config.getboolean('resources', 'run_report_memory', fallback=True)
+                       ) if RUN_REPORT_FILE else None
+    PROFILE_FILE = config.get('resources', 'profile_file', fallback=None)
+    profiler = start_profile(PROFILE_FILE)
     
     def get_data_source_id(database_id):
         """Get the data source ID from a database - required for new API version"""
@@ -41,13 +87,11 @@ def fetch_notion_table_data():
             return DATA_SOURCE_ID
         
         # Get database info to find data sources
-        url = f"https://api.notion.com/v1/databases/{database_id}"
-        response = requests.get(url, headers=headers)
-        
-        if response.status_code != 200:
-            raise Exception(f'Error getting database info: {response.status_code} - {response.text}')
+        try:
+            db_info = client.get(f"/databases/{database_id}")
+        except NotionAPIError as e:
+            raise Exception(f'Error getting database info: {e.status_code} - {e.text}')
         
-        db_info = response.json()
         data_sources = db_info.get('data_sources', [])
         
         if not data_sources:
@@ -56,214 +100,157 @@ def fetch_notion_table_data():
         # Return the first data source ID (or all if you want to handle multiple)
         return data_sources[0]['id']
     
-    def query_data_source(data_source_id):
+    def edited_since(data_source_id, since):
+        """True when any page of the data source was edited on or after the given time"""
+        try:
+            response_json = client.post(f"/data_sources/{data_source_id}/query",
+                                        {"filter": last_edited_filter(minute_floor(since)), "page_size": 1})
+        except NotionAPIError as e:
+            raise Exception(f'Error checking for edits: {e.status_code} - {e.text}')
+        return bool(response_json["results"])
+    
+    def get_projection(data_source_id):
+        """Query params projecting the response onto the included / not excluded properties"""
+        if include_properties is None and not exclude_properties:
+            return None
+        try:
+            schema = client.get(f"/data_sources/{data_source_id}")
+        except NotionAPIError as e:
+            raise Exception(f'Error getting data source schema: {e.status_code} - {e.text}')
+        return projection_params(schema["properties"], include_properties, exclude_properties)
+    
+    def query_data_source(data_source_id, query_filter=None, projection=None):
         """Query the Notion data source using new API structure"""
-        url = f"https://api.notion.com/v1/data_sources/{data_source_id}/query"
-        results = []
-        next_cursor = None
-        
-        while True:
-            payload = {}
-            if next_cursor:
-                payload["start_cursor"] = next_cursor
-            
-            response = requests.post(url, json=payload, headers=headers)
-            
-            if response.status_code != 200:
-                raise Exception(f'Error fetching data: {response.status_code} - {response.text}')
-            
-            response_json = response.json()
-            results.extend(response_json["results"])
-            next_cursor = response_json.get("next_cursor")
-            
-            if not next_cursor:
-                break
+        payload = {"filter": query_filter} if query_filter else {}
+        try:
+            results = paginate(lambda payload: client.post(f"/data_sources/{data_source_id}/query", payload, projection),
+                               payload)
+        except NotionAPIError as e:
+            raise Exception(f'Error fetching data: {e.status_code} - {e.text}')
         
         return {"results": results}
     
-    def get_column_titles(data_json):
-        """Extract column titles from the first record"""
-        if not data_json["results"]:
-            return []
-        return list(data_json["results"][0]["properties"].keys())
+    def query_data_source_pages(data_source_id, projection=None):
+        """Yield the results of each response so they can be decoded while the next page is fetched"""
+        try:
+            yield from iter_result_pages(
+                lambda payload: client.post(f"/data_sources/{data_source_id}/query", payload, projection), {})
+        except NotionAPIError as e:
+            raise Exception(f'Error fetching data: {e.status_code} - {e.text}')
     
-    def get_column_types(data_json, columns_title):
-        """Extract column types for proper data processing"""
-        if not data_json["results"]:
-            return {}
-        
-        type_data = {}
-        for title in columns_title:
-            type_data[title] = data_json["results"][0]["properties"][title]["type"]
-        return type_data
+    def query_data_source_partitioned(data_source_id, projection=None):
+        """Query the data source in disjoint date ranges concurrently and merge them in date order"""
+        try:
+            return fetch_date_partitioned(
+                lambda payload: client.post(f"/data_sources/{data_source_id}/query", payload, projection),
+                by=FETCH_PARTITION, max_workers=FETCH_WORKERS)
+        except NotionAPIError as e:
+            raise Exception(f'Error fetching data: {e.status_code} - {e.text}')
     
-    def extract_table_data(data_json, columns_type):
-        """Extract and format table data based on column types - improved for better type handling"""
-        table_data = {}
-        
-        for column_name, column_type in columns_type.items():
-            # Handle checkbox properties (boolean values)
-            if column_type == "checkbox":
-                table_data[column_name] = [
-                    record["properties"][column_name]["checkbox"] 
-                    if record["properties"][column_name]["checkbox"] is not None
-                    else False
-                    for record in data_json["results"]
-                ]
-            
-            # Handle number properties
-            elif column_type == "number":
-                table_data[column_name] = [
-                    record["properties"][column_name]["number"]
-                    if record["properties"][column_name]["number"] is not None
-                    else 0
-                    for record in data_json["results"]
-                ]
-            
-            # Handle email and phone number properties
-            elif column_type in ["email", "phone_number"]:
-                table_data[column_name] = [
-                    record["properties"][column_name][column_type]
-                    if record["properties"][column_name][column_type] is not None
-                    else ""
-                    for record in data_json["results"]
-                ]
-            
-            # Handle date properties
-            elif column_type == "date":
-                table_data[column_name] = [
-                    record["properties"][column_name]["date"]["start"]
-                    if record["properties"][column_name]["date"]
-                    else ""
-                    for record in data_json["results"]
-                ]
-            
-            # Handle rich text and title properties
-            elif column_type in ["rich_text", "title"]:
-                table_data[column_name] = [
-                    record["properties"][column_name][column_type][0]["plain_text"]
-                    if record["properties"][column_name][column_type] and len(record["properties"][column_name][column_type]) > 0
-                    else ""
-                    for record in data_json["results"]
-                ]
-            
-            # Handle select properties
-            elif column_type == "select":
-                table_data[column_name] = [
-                    record["properties"][column_name]["select"]["name"]
-                    if record["properties"][column_name]["select"]
-                    else ""
-                    for record in data_json["results"]
-                ]
-            
-            # Handle multi_select properties
-            elif column_type == "multi_select":
-                table_data[column_name] = [
-                    ", ".join([option["name"] for option in record["properties"][column_name]["multi_select"]])
-                    if record["properties"][column_name]["multi_select"]
-                    else ""
-                    for record in data_json["results"]
-                ]
-            
-            # Handle files properties
-            elif column_type == "files":
-                table_data[f"{column_name}_FileName"] = [
-                    record["properties"][column_name]["files"][0]["name"]
-                    if record["properties"][column_name]["files"]
-                    else ""
-                    for record in data_json["results"]
-                ]
-                table_data[f"{column_name}_FileUrl"] = [
-                    record["properties"][column_name]["files"][0]["file"]["url"]
-                    if record["properties"][column_name]["files"] and "file" in record["properties"][column_name]["files"][0]
-                    else record["properties"][column_name]["files"][0]["external"]["url"]
-                    if record["properties"][column_name]["files"] and "external" in record["properties"][column_name]["files"][0]
-                    else ""
-                    for record in data_json["results"]
-                ]
-            
-            # Handle people properties
-            elif column_type == "people":
-                table_data[f"{column_name}_Names"] = [
-                    ", ".join([person["name"] for person in record["properties"][column_name]["people"] if "name" in person])
-                    if record["properties"][column_name]["people"]
-                    else ""
-                    for record in data_json["results"]
-                ]
-            
-            # Handle URL properties
-            elif column_type == "url":
-                table_data[column_name] = [
-                    record["properties"][column_name]["url"]
-                    if record["properties"][column_name]["url"]
-                    else ""
-                    for record in data_json["results"]
-                ]
-            
-            # Handle relation properties
-            elif column_type == "relation":
-                table_data[f"{column_name}_Relations"] = [
-                    ", ".join([rel["id"] for rel in record["properties"][column_name]["relation"]])
-                    if record["properties"][column_name]["relation"]
-                    else ""
-                    for record in data_json["results"]
-                ]
-            
-            # Handle formula properties
-            elif column_type == "formula":
-                table_data[column_name] = [
-                    record["properties"][column_name]["formula"]["string"]
-                    if record["properties"][column_name]["formula"] and record["properties"][column_name]["formula"]["type"] == "string"
-                    else record["properties"][column_name]["formula"]["number"]
-                    if record["properties"][column_name]["formula"] and record["properties"][column_name]["formula"]["type"] == "number"
-                    else record["properties"][column_name]["formula"]["boolean"]
-                    if record["properties"][column_name]["formula"] and record["properties"][column_name]["formula"]["type"] == "boolean"
-                    else ""
-                    for record in data_json["results"]
-                ]
-            
-            else:
-                # For any other column types, try to extract safely
-                table_data[column_name] = [
-                    str(record["properties"][column_name])
-                    for record in data_json["results"]
-                ]
-        
-        return table_data
+    def query_data_source_incremental(data_source_id, page_store_file, projection=None):
+        """Fetch only pages edited since the last sync and merge them into the local page store"""
+        page_store = NotionPageStore(page_store_file, PAGE_STORE_FULL_REFRESH)
+        try:
+            query_filter = page_store.sync_filter(data_source_id, projection)
+            data = query_data_source(data_source_id, query_filter=query_filter, projection=projection)
+            page_store.merge(data_source_id, data["results"], projection, full=query_filter is None)
+            print(f"Merged {len(data['results'])} changed pages into {page_store_file}")
+            return {"results": page_store.pages(data_source_id)}
+        finally:
+            page_store.close()
     
     try:
+        # Serve a young snapshot straight from disk without calling Notion
+        age = snapshot_age(SNAPSHOT_FILE) if SNAPSHOT_FILE else None
+        if age is not None and not snapshot_matches(SNAPSHOT_FILE, SNAPSHOT_KEY):
+            print(f"Snapshot {SNAPSHOT_FILE} holds another data source or projection, fetching")
+            age = None
+        if age is not None and age < SNAPSHOT_TTL:
+            print(f"Using snapshot {SNAPSHOT_FILE} ({age:.0f}s old)")
+            with span(report, 'read_snapshot') as stage:
+                df = read_snapshot(SNAPSHOT_FILE)
+                stage['rows'] = len(df)
+            return df
+        
         # Get data source ID from database
         print("Discovering data source ID...")
-        data_source_id = get_data_source_id(DATABASE_ID)
+        with span(report, 'discover'):
+            data_source_id = get_data_source_id(DATABASE_ID)
         print(f"Using data source ID: {data_source_id}")
         
+        # An older snapshot is still valid when nothing was edited since it was taken
+        if age is not None:
+            taken_at = snapshot_taken_at(SNAPSHOT_FILE)
+            with span(report, 'edited_since'):
+                edited = not taken_at or edited_since(data_source_id, taken_at)
+            if not edited:
+                print(f"No edits since {taken_at}, using snapshot {SNAPSHOT_FILE}")
+                mark_snapshot_fresh(SNAPSHOT_FILE)
+                with span(report, 'read_snapshot') as stage:
+                    df = read_snapshot(SNAPSHOT_FILE)
+                    stage['rows'] = len(df)
+                return df
+        fetch_started = utc_now()
+        
+        # Resolve the property projection once from the data source schema
+        with span(report, 'schema'):
+            projection = get_projection(data_source_id)
+        
         # Fetch data from Notion using new API
         print("Fetching data from Notion...")
-        data = query_data_source(data_source_id)
+        with span(report, 'fetch') as stage:
+            if PAGE_STORE_FILE:
+                batches = [query_data_source_incremental(data_source_id, PAGE_STORE_FILE, projection)["results"]]
+            elif FETCH_PARTITION:
+                batches = [query_data_source_partitioned(data_source_id, projection)["results"]]
+            else:
+                batches = read_ahead(query_data_source_pages(data_source_id, projection))
+            
+            # Decode each batch of pages into typed column chunks as it arrives
+            # (streamed pages are fetched during this step too)
+            builder = stream_table_data(batches)
+            stage['rows'] = builder.row_count if builder else 0
         
-        if not data["results"]:
+        if builder is None:
             print("No data found in the data source.")
             return pd.DataFrame()
         
         # Extract column information
-        columns_title = get_column_titles(data)
-        columns_type = get_column_types(data, columns_title)
+        columns_type = builder.columns_type
         
-        print(f"Found columns: {columns_title}")
+        print(f"Found columns: {list(columns_type.keys())}")
         print(f"Column types: {columns_type}")
         
-        # Extract and format table data
-        table_data = extract_table_data(data, columns_type)
-        
-        # Convert to DataFrame
-        df = pd.DataFrame.from_dict(table_data)
+        with span(report, 'to_frame') as stage:
+            # Assemble the table data from the chunks
+            table_data = builder.to_dict()
+            
+            # Convert to DataFrame
+            df = pd.DataFrame.from_dict(table_data)
+            stage['rows'] = len(df)
         
         print(f"Successfully fetched {len(df)} rows and {len(df.columns)} columns")
+        print(f"Notion requests: {client.stats()}")
+        
+        if SNAPSHOT_FILE:
+            # A snapshot that cannot be written must not cost the rows just fetched
+            try:
+                with span(report, 'write_snapshot') as stage:
+                    write_snapshot(df, SNAPSHOT_FILE, fetch_started, SNAPSHOT_KEY)
+                    stage['rows'] = len(df)
+            except Exception as e:
+                print(f"Warning: Could not write snapshot {SNAPSHOT_FILE}: {str(e)}")
         return df
         
     except Exception as e:
         print(f"Error: {str(e)}")
         return pd.DataFrame()
+    
+    finally:
+        dump_profile(profiler, PROFILE_FILE)
+        if report:
+            report.close()
+            report.write(RUN_REPORT_FILE)
 
 # Main execution
 if __name__ == "__main__":
@@ -287,57 +274,77 @@ if __name__ == "__main__":
 # For Power BI PowerQuery, you can call this function directly:
 # df = fetch_notion_table_data()
 
-# Additional function to handle multiple data sources if needed
-def fetch_all_data_sources(database_id=None):
+# Additional functions to handle multiple data sources if needed
+def fetch_data_source_frame(client, data_source_id, include_properties=None, exclude_properties=None):
+    """Fetch one data source into its own typed DataFrame"""
+    projection = None
+    if include_properties is not None or exclude_properties:
+        schema = client.get(f"/data_sources/{data_source_id}")
+        projection = projection_params(schema["properties"], include_properties, exclude_properties)
+    batches = iter_result_pages(
+        lambda payload: client.post(f"/data_sources/{data_source_id}/query", payload, projection), {})
+    builder = stream_table_data(batches)
+    return pd.DataFrame.from_dict(builder.to_dict()) if builder else pd.DataFrame()
+
+def fetch_data_sources(data_sources, token=None, max_workers=DEFAULT_WORKERS, include_properties=None,
+                       exclude_properties=None):
     """
-    Fetch data from all data sources in a database
-    Useful if you upgrade to multi-source databases
+    Fetch several data sources concurrently through one shared client.
+    data_sources is a list of data source ids or of {'id': ..., 'name': ...} dicts.
+    Each source is extracted with its own columns, tagged with data_source_name / data_source_id
+    and the frames are concatenated in the given order.
     """
-    if not database_id:
-        config = configparser.ConfigParser()
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        config_path = os.path.join(script_dir, 'config.ini')
-        config.read(config_path)
-        database_id = config['tables']['daily_habit_tracker']
-    
-    # Get all data sources for the database
-    NOTION_TOKEN = config['secret']['token']
-    headers = {
-        "Authorization": f"Bearer {NOTION_TOKEN}",
-        "Notion-Version": "2025-09-03",
-        "Content-Type": "application/json"
-    }
-    
-    url = f"https://api.notion.com/v1/databases/{database_id}"
-    response = requests.get(url, headers=headers)
+    config = load_config()
+    if token is None:
+        token = config['secret']['token']
+    client = connector_client(config, token)
+    sources = [source if isinstance(source, dict) else {'id': source, 'name': ''} for source in data_sources]
     
-    if response.status_code != 200:
-        raise Exception(f'Error getting database info: {response.status_code} - {response.text}')
+    def fetch(source):
+        try:
+            return fetch_data_source_frame(client, source['id'], include_properties, exclude_properties)
+        except NotionAPIError as e:
+            raise Exception(f"Error fetching data source {source['id']}: {e.status_code} - {e.text}")
     
-    db_info = response.json()
-    data_sources = db_info.get('data_sources', [])
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(sources)))) as pool:
+        frames = list(pool.map(fetch, sources))
     
     all_dataframes = []
-    for i, data_source in enumerate(data_sources):
-        print(f"Fetching data from data source {i+1}/{len(data_sources)}: {data_source['name']}")
-        
-        # Create a temporary function to fetch this specific data source
-        temp_config = configparser.ConfigParser()
-        temp_config.read_dict({
-            'secret': {'token': NOTION_TOKEN},
-            'tables': {
-                'daily_habit_tracker': database_id,
-                'daily_habit_tracker_data_source': data_source['id']
-            }
-        })
-        
-        df = fetch_notion_table_data()
+    for source, df in zip(sources, frames):
         if not df.empty:
-            df['data_source_name'] = data_source['name']
-            df['data_source_id'] = data_source['id']
+            df['data_source_name'] = source.get('name', '')
+            df['data_source_id'] = source['id']
             all_dataframes.append(df)
+    print(f"Notion requests: {client.stats()}")
     
     if all_dataframes:
         return pd.concat(all_dataframes, ignore_index=True)
     else:
         return pd.DataFrame()
+
+def fetch_all_data_sources(database_id=None, data_source_ids=None, max_workers=None):
+    """
+    Fetch data from all data sources in a database, or only from the given data source ids
+    Useful if you upgrade to multi-source databases
+    """
+    config = load_config()
+    NOTION_TOKEN = config['secret']['token']
+    if max_workers is None:
+        max_workers = config.getint('resources', 'fetch_workers', fallback=DEFAULT_WORKERS)
+    
+    if data_source_ids is None:
+        if not database_id:
+            database_id = config['tables']['daily_habit_tracker']
+        
+        # Get all data sources for the database
+        client = connector_client(config, NOTION_TOKEN)
+        try:
+            db_info = client.get(f"/databases/{database_id}")
+        except NotionAPIError as e:
+            raise Exception(f'Error getting database info: {e.status_code} - {e.text}')
+        data_sources = db_info.get('data_sources', [])
+    else:
+        data_sources = list(data_source_ids)
+    
+    print(f"Fetching {len(data_sources)} data sources with up to {max_workers} workers")
+    return fetch_data_sources(data_sources, NOTION_TOKEN, max_workers)
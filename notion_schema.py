@@ -0,0 +1,29 @@
+from urllib.parse import unquote
+
+
+def property_ids(properties, include=None, exclude=None):
+    """
+    Property ids to request from a database or data source schema ({name: {"id": ..., "type": ...}}).
+    include keeps only the named properties, exclude drops the named ones.
+    Ids are unquoted because Notion returns them url-encoded and requests encodes query params again.
+    """
+    unknown = [name for name in (include or []) if name not in properties]
+    if unknown:
+        raise KeyError(f'Properties not found in schema: {unknown}')
+    names = [name for name in properties
+             if (include is None or name in include) and (exclude is None or name not in exclude)]
+    return [unquote(properties[name]["id"]) for name in names]
+
+
+def projection_params(properties, include=None, exclude=None):
+    """Query params limiting the response to the projected properties, None when nothing is projected"""
+    if include is None and not exclude:
+        return None
+    return {"filter_properties": property_ids(properties, include, exclude)}
+
+
+def split_names(value):
+    """Comma separated property names from config, None when empty"""
+    if not value:
+        return None
+    return [name.strip() for name in value.split(',') if name.strip()]
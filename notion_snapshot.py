@@ -0,0 +1,86 @@
+import json
+import os
+import time
+from datetime import datetime, timezone
+
+# seconds a snapshot is served without asking Notion
+DEFAULT_TTL = 300
+
+TAKEN_AT_KEY = b'snapshot_taken_at'
+# what the snapshot holds: the data source (or database) and the property projection
+SOURCE_KEY = b'snapshot_source'
+
+
+def _feather():
+    try:
+        import pyarrow
+        import pyarrow.feather
+    except ImportError:
+        raise ImportError('Snapshots require pyarrow: pip install pyarrow')
+    return pyarrow
+
+
+def snapshot_age(path):
+    """Seconds since the snapshot was written or confirmed unchanged, None when there is no snapshot"""
+    if not os.path.exists(path):
+        return None
+    return time.time() - os.path.getmtime(path)
+
+
+def snapshot_key(source_id, include_properties=None, exclude_properties=None):
+    """Identifies a snapshot's contents, so one fetched for another source or projection is never served"""
+    return json.dumps({
+        'source': source_id.replace('-', ''),
+        'include': sorted(include_properties) if include_properties is not None else None,
+        'exclude': sorted(exclude_properties or []),
+    }, sort_keys=True)
+
+
+def _metadata(path, key):
+    pa = _feather()
+    metadata = pa.feather.read_table(path, memory_map=True).schema.metadata or {}
+    return metadata[key].decode() if key in metadata else None
+
+
+def snapshot_taken_at(path):
+    """UTC time the snapshot's fetch started, as stored in the file metadata"""
+    return _metadata(path, TAKEN_AT_KEY)
+
+
+def snapshot_matches(path, key):
+    """True when the snapshot was written for the given snapshot_key"""
+    return _metadata(path, SOURCE_KEY) == key
+
+
+def read_snapshot(path):
+    """Load a snapshot through a memory map"""
+    pa = _feather()
+    return pa.feather.read_table(path, memory_map=True).to_pandas()
+
+
+def write_snapshot(df, path, taken_at, key=None):
+    """Write a snapshot atomically; uncompressed so it can be memory-mapped on read"""
+    pa = _feather()
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[TAKEN_AT_KEY] = taken_at.encode()
+    if key is not None:
+        metadata[SOURCE_KEY] = key.encode()
+    table = table.replace_schema_metadata(metadata)
+    tmp_path = path + '.tmp'
+    pa.feather.write_feather(table, tmp_path, compression='uncompressed')
+    os.replace(tmp_path, path)
+
+
+def mark_snapshot_fresh(path):
+    """Restart the TTL after Notion confirmed there were no edits"""
+    os.utime(path, None)
+
+
+def utc_now():
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+
+
+def minute_floor(timestamp):
+    """Notion rounds last_edited_time down to the minute, so compare from the start of the minute"""
+    return timestamp[:16] + ':00.000Z'
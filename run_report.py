@@ -0,0 +1,127 @@
+import cProfile
+import json
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+STAGE_FIELDS = ['seconds', 'requests', 'bytes', 'rows', 'peak_bytes']
+
+
+class RunReport:
+    """
+    Timing of the stages of one run: wall time, Notion requests and response bytes, rows processed
+    and the tracemalloc peak of each stage. Stages run one after another; spans do not nest.
+    client: NotionClient whose counters are attributed to the stages, it can also be set later.
+    memory: trace allocations with tracemalloc, which slows the run down.
+    """
+
+    def __init__(self, run, client=None, memory=True):
+        self.run = run
+        self.client = client
+        self.memory = memory
+        self.stages = []
+        self.started_at = datetime.now(timezone.utc)
+        self.started = time.perf_counter()
+        # only stop tracing at close when this report started it
+        self.tracing = memory and not tracemalloc.is_tracing()
+        if self.tracing:
+            tracemalloc.start()
+
+    def _http(self):
+        if self.client is None:
+            return 0, 0
+        stats = self.client.stats()
+        return stats['requests'], stats['bytes']
+
+    @contextmanager
+    def span(self, name):
+        """Time one stage; the yielded dict takes the rows processed as stage['rows']"""
+        stage = {'stage': name, 'rows': None}
+        requests, size = self._http()
+        if self.memory:
+            tracemalloc.reset_peak()
+        started = time.perf_counter()
+        try:
+            yield stage
+        finally:
+            stage['seconds'] = time.perf_counter() - started
+            after_requests, after_size = self._http()
+            stage['requests'] = after_requests - requests
+            stage['bytes'] = after_size - size
+            stage['peak_bytes'] = tracemalloc.get_traced_memory()[1] if self.memory else None
+            self.stages.append(stage)
+
+    def to_dict(self):
+        peaks = [stage['peak_bytes'] for stage in self.stages if stage['peak_bytes'] is not None]
+        return {
+            'run': self.run,
+            'started': self.started_at.isoformat(timespec='seconds'),
+            'seconds': time.perf_counter() - self.started,
+            'requests': sum(stage['requests'] for stage in self.stages),
+            'bytes': sum(stage['bytes'] for stage in self.stages),
+            'peak_bytes': max(peaks) if peaks else None,
+            'stages': [{key: stage[key] for key in ['stage'] + STAGE_FIELDS} for stage in self.stages],
+        }
+
+    def prometheus(self):
+        """The report in the Prometheus text exposition format, one gauge per stage field"""
+        report = self.to_dict()
+        lines = []
+        for field in STAGE_FIELDS:
+            metric = f'streak_run_stage_{field}'
+            lines.append(f'# TYPE {metric} gauge')
+            for stage in report['stages']:
+                if stage[field] is not None:
+                    lines.append(f'{metric}{{run="{self.run}",stage="{stage["stage"]}"}} {stage[field]}')
+        lines.append('# TYPE streak_run_seconds gauge')
+        lines.append(f'streak_run_seconds{{run="{self.run}"}} {report["seconds"]}')
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path):
+        """
+        Write the report: Prometheus text for .prom paths, one appended JSON line per run for .jsonl paths
+        so runs can be compared over time, otherwise a JSON document replaced atomically.
+        """
+        if path.endswith('.jsonl'):
+            with open(path, 'a') as f:
+                f.write(json.dumps(self.to_dict()) + '\n')
+            return
+        with open(path + '.tmp', 'w') as f:
+            if path.endswith('.prom'):
+                f.write(self.prometheus())
+            else:
+                json.dump(self.to_dict(), f, indent=2)
+        os.replace(path + '.tmp', path)
+
+    def close(self):
+        if self.tracing:
+            tracemalloc.stop()
+            self.tracing = False
+
+
+@contextmanager
+def span(report, name):
+    """report.span(name), or an untimed stage when no report is kept"""
+    if report is None:
+        yield {}
+    else:
+        with report.span(name) as stage:
+            yield stage
+
+
+def start_profile(path):
+    """A running cProfile profiler when a dump path is given, otherwise None"""
+    if not path:
+        return None
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def dump_profile(profiler, path):
+    """Stop the profiler and write its stats to path, to be read with pstats or snakeviz"""
+    if profiler is not None:
+        profiler.disable()
+        profiler.dump_stats(path)
@@ -0,0 +1,169 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from streak_engine import (STREAK_COLUMNS, calculate_streaks, day_attributes, habit_done, habit_streaks,
+                           number_streaks, slice_days, tracker_dates)
+
+CHECKPOINT_VERSION = 2
+
+
+def checkpoint_path(streaks_file):
+    """Default location of the checkpoint saved next to the streaks output"""
+    return streaks_file + '.checkpoint.json'
+
+
+def load_checkpoint(path):
+    """Load a checkpoint file, returning None when it is missing or from another version"""
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        checkpoint = json.load(f)
+    if checkpoint.get('version') != CHECKPOINT_VERSION:
+        return None
+    return checkpoint
+
+
+def save_checkpoint(checkpoint, path):
+    """Write the checkpoint atomically so an interrupted run never leaves a partial file"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
+
+
+def load_streaks(path):
+    """Read a previously written streaks file, or None when there is none"""
+    if not os.path.exists(path):
+        return None
+    return pd.read_csv(path, parse_dates=['start_date', 'end_date'])
+
+
+def habits_fingerprint(habits):
+    """Fingerprint of the habit list and frequencies; any change forces a full recompute"""
+    items = [[str(name), str(freq)] for name, freq in zip(habits['Short Name'], habits['Frequency'])]
+    return hashlib.sha1(json.dumps(items).encode('utf-8')).hexdigest()
+
+
+def day_fingerprints(done_columns, days):
+    """One fingerprint per day over everything the streak kernels read for that day"""
+    frame = pd.DataFrame({**days, **{f'habit_{i}': done for i, done in enumerate(done_columns)}})
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy()
+
+
+def first_changed_row(dates, fingerprints, checkpoint):
+    """First row whose date or fingerprint differs from the checkpoint"""
+    old_dates = checkpoint['dates']
+    old_fingerprints = checkpoint['fingerprints']
+    same = min(len(old_dates), len(dates))
+    new_dates = [str(d)[:10] for d in dates[:same]]
+    changed = np.flatnonzero((np.array(new_dates, dtype=object) != np.array(old_dates[:same], dtype=object))
+                             | (fingerprints[:same] != np.array(old_fingerprints[:same], dtype=np.uint64)))
+    if len(changed):
+        return int(changed[0])
+    if len(old_dates) == len(dates):
+        return None
+    return same
+
+
+def build_checkpoint(dates, fingerprints, habits):
+    """
+    What the next run compares against: the habit list and each day's date and fingerprint.
+    Streak state itself is rebuilt from the previous streaks output.
+    """
+    return {
+        'version': CHECKPOINT_VERSION,
+        'habits': habits_fingerprint(habits),
+        'dates': [str(d)[:10] for d in dates],
+        'fingerprints': [int(f) for f in fingerprints],
+    }
+
+
+def calculate_streaks_incremental(daily_habit_tracker_df, habits_df, calendar, previous_streaks_df=None,
+                                  checkpoint=None, series=False):
+    """
+    Calculate streaks reusing the previous output where the input has not changed.
+    Each habit is replayed from the start of its last streak opened before the first changed day,
+    which is always a point where the habit had no active streak. No kernel state is kept, so this is
+    not incremental in the changed days: every day from that point to the end of the tracker is
+    recalculated, a long active streak on every run and an edit far in the past almost in full.
+    Returns the streaks dataframe and the new checkpoint.
+    The per-day series covers every day, so series=True recalculates in full and also returns the series.
+    """
+    habits = habits_df.drop_duplicates('Short Name')
+    dates = tracker_dates(daily_habit_tracker_df)
+    if len(dates) == 0:
+        empty_checkpoint = build_checkpoint(dates, np.zeros(0, dtype=np.uint64), habits)
+        if series:
+            streaks_df, series_df = calculate_streaks(daily_habit_tracker_df, habits_df, calendar, series=True)
+            return streaks_df, empty_checkpoint, series_df
+        return pd.DataFrame(columns=STREAK_COLUMNS), empty_checkpoint
+
+    days = day_attributes(dates, calendar)
+    done_columns = [habit_done(daily_habit_tracker_df, habit) for habit in habits['Short Name']]
+    fingerprints = day_fingerprints(done_columns, days)
+
+    if series:
+        streaks_df, series_df = calculate_streaks(daily_habit_tracker_df, habits_df, calendar, series=True)
+        return streaks_df, build_checkpoint(dates, fingerprints, habits), series_df
+
+    reusable = (checkpoint is not None and previous_streaks_df is not None
+                and checkpoint.get('habits') == habits_fingerprint(habits))
+    if not reusable:
+        streaks_df = calculate_streaks(daily_habit_tracker_df, habits_df, calendar)
+        return streaks_df, build_checkpoint(dates, fingerprints, habits)
+
+    changed = first_changed_row(dates, fingerprints, checkpoint)
+    if changed is None:
+        return previous_streaks_df[STREAK_COLUMNS], checkpoint
+
+    # rows are identical before the change, so previous streak dates map back onto row positions
+    positions = {habit: pos for pos, habit in enumerate(habits['Short Name'])}
+    previous = previous_streaks_df[previous_streaks_df['name'].isin(positions)]
+    start_row = np.searchsorted(dates[:changed], pd.to_datetime(previous['start_date'], cache=False).to_numpy())
+    end_row = np.searchsorted(dates[:changed], pd.to_datetime(previous['end_date'], cache=False).to_numpy())
+    habit_pos = previous['name'].map(positions).to_numpy(dtype=np.int64)
+
+    # each habit is replayed from its last streak opened before the change
+    before = start_row < changed
+    last_start = np.full(len(positions), -1, dtype=np.int64)
+    np.maximum.at(last_start, habit_pos[before], start_row[before])
+    replay_from = np.where(last_start >= 0, last_start, changed)
+
+    kept = before & (start_row < replay_from[habit_pos])
+    frames = [pd.DataFrame({
+        'start_row': start_row[kept],
+        'habit_pos': habit_pos[kept],
+        'name': previous['name'].to_numpy()[kept],
+        'start_date': dates[start_row[kept]],
+        'end_date': dates[end_row[kept]],
+        'streak_count': previous['streak_count'].to_numpy(dtype=np.int64)[kept],
+        'extra': previous['extra'].to_numpy(dtype=np.int64)[kept],
+        'active': previous['active'].to_numpy(dtype=bool)[kept],
+    })]
+    # the replayed streaks of every habit go into a single frame
+    results = [habit_streaks(freq, done_columns[pos][start:], slice_days(days, start))
+               for pos, (freq, start) in enumerate(zip(habits['Frequency'], replay_from))]
+    counts = [len(result[0]) for result in results]
+    offsets = np.repeat(replay_from, counts)
+    replayed_pos = np.repeat(np.arange(len(results)), counts)
+
+    def replayed(i, dtype):
+        return np.concatenate([np.asarray(result[i], dtype=dtype) for result in results])
+
+    frames.append(pd.DataFrame({
+        'start_row': replayed(0, np.int64) + offsets,
+        'habit_pos': replayed_pos,
+        'name': habits['Short Name'].to_numpy()[replayed_pos],
+        'start_date': dates[replayed(0, np.int64) + offsets],
+        'end_date': dates[replayed(1, np.int64) + offsets],
+        'streak_count': replayed(2, np.int64),
+        'extra': replayed(3, np.int64),
+        'active': replayed(4, bool),
+    }))
+
+    streaks_df = number_streaks(frames)
+    return streaks_df, build_checkpoint(dates, fingerprints, habits)
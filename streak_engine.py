@@ -0,0 +1,378 @@
+import numpy as np
+import pandas as pd
+
+from calendar_index import CalendarIndex
+from frequency_rules import frequency_rule, warn_unknown_frequency
+from habit_matrix import HabitMatrix
+
+STREAK_COLUMNS = ['id', 'name', 'start_date', 'end_date', 'streak_count', 'extra', 'active']
+
+# initial window (in rows) used when scanning forward from the start of a 3x-a-Week streak
+SCAN_WINDOW = 32
+
+
+def habit_done_array(values):
+    """Convert a habit column to a boolean 'done' array using the same truthiness as the row loop"""
+    values = pd.Series(values)
+    if values.dtype == bool:
+        return values.to_numpy()
+    if pd.api.types.is_numeric_dtype(values.dtype):
+        # NaN is truthy in python, so it counts as done just like `if habit_done:`
+        return values.to_numpy(dtype=float) != 0
+    return np.array([bool(v) for v in values.to_numpy(dtype=object)], dtype=bool)
+
+
+# Kernels return (starts, ends, counts, extras, active, closes, counted):
+# closes is the row each streak stops being active (len(done) while active)
+# and counted marks the rows that added to a streak count.
+
+def _empty_streaks(n=0):
+    empty = np.zeros(0, dtype=np.int64)
+    return empty, empty, empty, empty, np.zeros(0, dtype=bool), empty, np.zeros(n, dtype=bool)
+
+
+def _first_true_at_or_after(cum, pos):
+    """Index of the first True at or after pos, given cum = [0, cumsum(mask)]; -1 if there is none"""
+    if pos >= len(cum) - 1 or cum[pos] == cum[-1]:
+        return -1
+    return int(np.searchsorted(cum, cum[pos] + 1)) - 1
+
+
+def daily_streaks(done):
+    """Streaks for 'Daily' habits: every run of consecutive done days is one streak"""
+    n = len(done)
+    if not done.any():
+        return _empty_streaks(n)
+    padded = np.concatenate(([False], done, [False])).astype(np.int8)
+    edges = np.diff(padded)
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1) - 1
+    counts = ends - starts + 1
+    return starts, ends, counts, np.zeros(len(starts), dtype=np.int64), ends == n - 1, ends + 1, done
+
+
+def interval_streaks(done, every):
+    """Streaks for habits done at least once every `every` days: a longer gap between completions breaks them"""
+    n = len(done)
+    done_rows = np.flatnonzero(done)
+    if not len(done_rows):
+        return _empty_streaks(n)
+    first = np.flatnonzero(np.concatenate(([True], np.diff(done_rows) > every)))
+    last = np.append(first[1:] - 1, len(done_rows) - 1)
+    active = np.zeros(len(first), dtype=bool)
+    active[-1] = n - 1 - done_rows[-1] < every
+    closes = np.minimum(done_rows[last] + every, n)
+    return (done_rows[first], done_rows[last], last - first + 1, np.zeros(len(first), dtype=np.int64), active,
+            closes, done)
+
+
+def weekdays_streaks(done, is_weekday):
+    """Streaks for 'Weekdays' habits: only a missed weekday breaks the streak, weekends count as extra"""
+    n = len(done)
+    if not done.any():
+        return _empty_streaks(n)
+    # every missed weekday closes the active streak, so it starts a new group
+    missed = is_weekday & ~done
+    group = np.cumsum(missed)
+    done_rows = np.flatnonzero(done)
+    done_group = group[done_rows]
+    groups, first = np.unique(done_group, return_index=True)
+    starts = done_rows[first]
+    slot = np.searchsorted(groups, done_group)
+    counts = np.bincount(slot, weights=is_weekday[done_rows], minlength=len(groups)).astype(np.int64)
+    extras = np.bincount(slot, weights=~is_weekday[done_rows], minlength=len(groups)).astype(np.int64)
+
+    # end date moves to the last weekday done in the group, weekend-only streaks keep their start date
+    ends = starts.copy()
+    weekday_rows = done_rows[is_weekday[done_rows]]
+    if len(weekday_rows):
+        weekday_slot = np.searchsorted(groups, group[weekday_rows])
+        last = len(weekday_rows) - 1 - np.unique(weekday_slot[::-1], return_index=True)[1]
+        ends[weekday_slot[last]] = weekday_rows[last]
+
+    # group g is closed by the missed weekday with index g
+    closes = np.append(np.flatnonzero(missed), n)[np.minimum(groups, missed.sum())]
+    return starts, ends, counts, extras, groups == group[-1], closes, done & is_weekday
+
+
+def weekly_streaks(done, week):
+    """
+    Streaks for 'Weekly' habits: one completion per consecutive week.
+    Week numbers must be non-decreasing over the rows.
+    """
+    n = len(done)
+    done_cum = np.concatenate(([0], np.cumsum(done)))
+    miss_cum = np.concatenate(([0], np.cumsum(~done)))
+    if done_cum[-1] == 0:
+        return _empty_streaks(n)
+
+    # contiguous blocks of rows sharing a week number
+    block_start = np.flatnonzero(np.concatenate(([True], week[1:] != week[:-1])))
+    block_end = np.append(block_start[1:], n)
+    block_week = week[block_start]
+    block_done = done_cum[block_end] - done_cum[block_start]
+    block_first_done = np.searchsorted(done_cum, done_cum[block_start] + 1) - 1
+
+    # chain_end[k] is the last block of the run of consecutive weeks with a completion following block k
+    linked = (block_done[1:] > 0) & (block_week[1:] == block_week[:-1] + 1)
+    breaks = np.append(np.flatnonzero(~linked), len(block_start) - 1)
+    chain_end = breaks[np.searchsorted(breaks, np.arange(len(block_start)))]
+
+    starts, ends, counts, extras, active, closes = [], [], [], [], [], []
+    counted = np.zeros(n, dtype=bool)
+    p = _first_true_at_or_after(done_cum, 0)
+    while p >= 0:
+        k = int(np.searchsorted(block_start, p, side='right')) - 1
+        last = int(chain_end[k])
+        count = last - k + 1
+        starts.append(p)
+        ends.append(int(block_first_done[last]) if last > k else p)
+        counts.append(count)
+        extras.append(int(done_cum[block_end[last]] - done_cum[p]) - count)
+        counted[p] = True
+        counted[block_first_done[k + 1:last + 1]] = True
+
+        # the streak stays active until a missed day two or more weeks after its last counted week
+        lo = int(np.searchsorted(week, block_week[last] + 2, side='left'))
+        miss = _first_true_at_or_after(miss_cum, lo)
+        active.append(miss < 0)
+        closes.append(n if miss < 0 else miss)
+        p = -1 if miss < 0 else _first_true_at_or_after(done_cum, miss + 1)
+
+    return (np.array(starts, dtype=np.int64), np.array(ends, dtype=np.int64),
+            np.array(counts, dtype=np.int64), np.array(extras, dtype=np.int64),
+            np.array(active, dtype=bool), np.array(closes, dtype=np.int64), counted)
+
+
+def three_per_week_streaks(done, week, days_left, per_week=3):
+    """
+    Streaks for '3x-a-Week' habits: the streak needs per_week completions for every week since it started
+    and breaks on the first missed day after which the target can no longer be reached.
+    Week numbers must be non-decreasing over the rows; any other period index (e.g. months) works the same way.
+    """
+    n = len(done)
+    done_cum = np.concatenate(([0], np.cumsum(done)))
+    starts, ends, counts, extras, active, closes = [], [], [], [], [], []
+    counted = np.zeros(n, dtype=bool)
+
+    p = _first_true_at_or_after(done_cum, 0)
+    while p >= 0:
+        window = SCAN_WINDOW
+        while True:
+            stop = min(p + window, n)
+            d = done[p:stop]
+            target = per_week * (week[p:stop] - week[p] + 1)
+            done_so_far = done_cum[p + 1:stop + 1] - done_cum[p]
+            # count = min(count + done, target) unrolled as a running minimum
+            slack = target - done_so_far
+            slack[0] = 0
+            count = done_so_far + np.minimum.accumulate(slack)
+            broken = np.flatnonzero(~d & (count + days_left[p:stop] < target))
+            if len(broken) or stop == n:
+                break
+            window *= 2
+
+        q = p + int(broken[0]) if len(broken) else n
+        streak_count = int(count[q - p - 1])
+        starts.append(p)
+        ends.append(p + int(np.searchsorted(count[:q - p], streak_count)))
+        counts.append(streak_count)
+        extras.append(int(done_cum[q] - done_cum[p]) - streak_count)
+        active.append(q == n)
+        closes.append(q)
+        counted[p] = True
+        counted[p + 1 + np.flatnonzero(np.diff(count[:q - p]) > 0)] = True
+        p = -1 if q == n else _first_true_at_or_after(done_cum, q + 1)
+
+    return (np.array(starts, dtype=np.int64), np.array(ends, dtype=np.int64),
+            np.array(counts, dtype=np.int64), np.array(extras, dtype=np.int64),
+            np.array(active, dtype=bool), np.array(closes, dtype=np.int64), counted)
+
+
+def untracked_streaks(done):
+    """Habits with an unknown frequency open a single streak on their first completion that never closes"""
+    n = len(done)
+    first = np.flatnonzero(done)[:1]
+    counted = np.zeros(n, dtype=bool)
+    counted[first] = True
+    return first, first.copy(), np.ones(len(first), dtype=np.int64), np.zeros(len(first), dtype=np.int64), \
+        np.ones(len(first), dtype=bool), np.full(len(first), n, dtype=np.int64), counted
+
+
+def compile_rule(rule):
+    """Turn a FrequencyRule into a kernel over a whole habit column and the day attributes"""
+    if rule.period == 'day' and rule.weekdays is not None:
+        eligible = list(rule.weekdays)
+
+        def kernel(done, days):
+            return weekdays_streaks(done, np.isin(days['weekday'], eligible))
+    elif rule.period == 'day':
+        def kernel(done, days):
+            return daily_streaks(done) if rule.every == 1 else interval_streaks(done, rule.every)
+    elif rule.count == 1:
+        def kernel(done, days):
+            return weekly_streaks(done, days[rule.period])
+    else:
+        def kernel(done, days):
+            return three_per_week_streaks(done, days[rule.period], days[rule.period + '_days_left'], rule.count)
+
+    if rule.extra == 'extra':
+        return kernel
+
+    def kernel_with_extra(done, days):
+        starts, ends, counts, extras, active, closes, counted = kernel(done, days)
+        if rule.extra == 'count':
+            # every completion while the streak is alive counts
+            counted = done & (alive_streak_index(starts, closes, len(done)) >= 0)
+            counted_cum = np.concatenate(([0], np.cumsum(counted)))
+            counts = counted_cum[closes] - counted_cum[starts]
+        return starts, ends, counts, np.zeros(len(starts), dtype=np.int64), active, closes, counted
+    return kernel_with_extra
+
+
+def alive_streak_index(starts, closes, n):
+    """Per row, the index of the streak alive on that row or -1; streaks of one habit never overlap"""
+    index = np.searchsorted(starts, np.arange(n), side='right') - 1
+    alive = index >= 0
+    alive[alive] = np.arange(n)[alive] < closes[index[alive]]
+    return np.where(alive, index, -1)
+
+
+def habit_streaks(habit_freq, done, days):
+    """Run a habit column through the kernel compiled from its frequency rule"""
+    rule = frequency_rule(habit_freq)
+    if rule is None:
+        warn_unknown_frequency(habit_freq)
+        return untracked_streaks(done)
+    return compile_rule(rule)(done, days)
+
+
+def day_attributes(dates, calendar):
+    """
+    Per-day arrays read by the kernels: weekday (0 = Monday, -1 unknown), week number and days left in the week
+    from the calendar, plus the month index and days left to the calendar end of the month.
+    """
+    if not isinstance(calendar, CalendarIndex):
+        calendar = CalendarIndex(calendar)
+    offsets = calendar.offsets(dates)
+    ordinals = np.asarray(dates).astype('datetime64[D]')
+    month = ordinals.astype('datetime64[M]')
+    # counted to the month end rather than the last tracked day, so a month still in progress stays open
+    month_last = (month + 1).astype('datetime64[D]') - np.timedelta64(1, 'D')
+    month_days_left = (month_last - ordinals).astype(np.int64)
+    month = month.astype(np.int64)
+    return {
+        'weekday': calendar.weekday[offsets],
+        'week': calendar.week[offsets],
+        'week_days_left': calendar.days_left[offsets],
+        'month': month,
+        'month_days_left': month_days_left,
+    }
+
+
+def slice_days(days, start):
+    return {key: values[start:] for key, values in days.items()}
+
+
+def tracker_dates(daily_habit_tracker_df):
+    """Dates of the tracker rows, from a frame or a HabitMatrix"""
+    if isinstance(daily_habit_tracker_df, HabitMatrix):
+        return daily_habit_tracker_df.dates
+    return pd.to_datetime(daily_habit_tracker_df['Date']).to_numpy()
+
+
+def habit_done(daily_habit_tracker_df, habit):
+    """Done array for a habit, all False when the tracker has no column for it"""
+    if isinstance(daily_habit_tracker_df, HabitMatrix):
+        if habit in daily_habit_tracker_df.habit_ids:
+            return daily_habit_tracker_df.done(habit)
+        return np.zeros(len(daily_habit_tracker_df), dtype=bool)
+    if habit in daily_habit_tracker_df.columns:
+        return habit_done_array(daily_habit_tracker_df[habit])
+    return np.zeros(len(daily_habit_tracker_df), dtype=bool)
+
+
+def streak_rows(habit_pos, habit, result, dates, row_offset=0):
+    """Frame of streaks for one habit, keeping the start row and habit position used for numbering"""
+    starts, ends, counts, extras, active = result[:5]
+    return pd.DataFrame({
+        'start_row': starts + row_offset,
+        'habit_pos': habit_pos,
+        'name': habit,
+        'start_date': dates[starts + row_offset],
+        'end_date': dates[ends + row_offset],
+        'streak_count': counts,
+        'extra': extras,
+        'active': active,
+    })
+
+
+def streak_series(result, n):
+    """
+    Point-in-time series for one habit over n rows: the streak count as of each day,
+    the longest streak count reached so far and whether a streak is alive on that day.
+    """
+    starts, closes, counted = result[0], result[5], result[6]
+    index = alive_streak_index(starts, closes, n)
+    alive = index >= 0
+    counted_cum = np.cumsum(counted)
+    counted_before = np.concatenate(([0], counted_cum))[starts]
+    current = np.where(alive, counted_cum - counted_before[np.maximum(index, 0)] if len(starts) else 0, 0)
+    longest = np.maximum.accumulate(current) if n else current
+    return current, longest, alive
+
+
+def series_frame(habits, series, dates):
+    """Dense long format series (Date, name, streak, longest, alive), one row per day and habit"""
+    def stacked(i, dtype):
+        if not series:
+            return np.zeros(0, dtype=dtype)
+        return np.stack([s[i] for s in series], axis=1).ravel().astype(dtype)
+
+    return pd.DataFrame({
+        'Date': np.repeat(dates, len(habits)),
+        'name': pd.Categorical.from_codes(np.tile(np.arange(len(habits)), len(dates)), categories=habits),
+        'streak': stacked(0, np.int32),
+        'longest': stacked(1, np.int32),
+        'alive': stacked(2, bool),
+    })
+
+
+def number_streaks(frames):
+    """Concatenate streak frames and assign ids in the order streaks are opened: by day, then by habit order"""
+    frames = [frame for frame in frames if len(frame)]
+    if not frames:
+        return pd.DataFrame(columns=STREAK_COLUMNS)
+    streaks_df = pd.concat(frames, ignore_index=True).sort_values(['start_row', 'habit_pos'], kind='stable')
+    streaks_df.insert(0, 'id', np.arange(1, len(streaks_df) + 1))
+    return streaks_df[STREAK_COLUMNS].reset_index(drop=True)
+
+
+def calculate_streaks(daily_habit_tracker_df, habits_df, calendar, series=False):
+    """
+    Calculate streaks for every habit in habits_df over the rows of daily_habit_tracker_df.
+    Rows are processed in their current order and each habit column is evaluated as a whole.
+    daily_habit_tracker_df is a filled tracker frame or a HabitMatrix.
+    calendar is a CalendarIndex or the calendar dataframe to build one from.
+    With series=True the per-day streak series is computed from the same kernel results and
+    (streaks_df, series_df) is returned.
+    """
+    dates = tracker_dates(daily_habit_tracker_df)
+    habits = habits_df.drop_duplicates('Short Name')
+    if len(dates) == 0:
+        empty = pd.DataFrame(columns=STREAK_COLUMNS)
+        return (empty, series_frame(list(habits['Short Name']), [], dates)) if series else empty
+
+    days = day_attributes(dates, calendar)
+
+    frames, habit_series = [], []
+    for habit_pos, (habit, habit_freq) in enumerate(zip(habits['Short Name'], habits['Frequency'])):
+        done = habit_done(daily_habit_tracker_df, habit)
+        result = habit_streaks(habit_freq, done, days)
+        frames.append(streak_rows(habit_pos, habit, result, dates))
+        if series:
+            habit_series.append(streak_series(result, len(dates)))
+
+    if series:
+        return number_streaks(frames), series_frame(list(habits['Short Name']), habit_series, dates)
+    return number_streaks(frames)
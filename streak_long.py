@@ -0,0 +1,138 @@
+import numpy as np
+import pandas as pd
+
+from calendar_index import day_ordinals, week_index
+from frequency_rules import frequency_rule, warn_unknown_frequency
+from streak_engine import STREAK_COLUMNS, compile_rule, habit_done_array
+
+# period offset between consecutive series, so weeks and months of different series never link up
+SERIES_GAP = 10 ** 7
+
+
+def _done_values(facts, value_column):
+    """Done flag of each long-format row: numbers are done when non-zero, empty values are not done"""
+    values = facts[value_column]
+    if values.dtype == bool or pd.api.types.is_numeric_dtype(values.dtype):
+        return habit_done_array(values.fillna(0) if values.dtype != bool else values)
+    return habit_done_array(values.replace(['', None], np.nan).fillna(False))
+
+
+def _series_layout(first, last, pad):
+    """
+    Row layout of series laid end to end, each followed by pad separator rows.
+    Returns the first row of each series, the series of every row, its day ordinal and whether it is a separator.
+    """
+    lengths = last - first + 1
+    offsets = np.concatenate(([0], np.cumsum(lengths + pad)))
+    series = np.repeat(np.arange(len(first)), lengths + pad)
+    local = np.arange(offsets[-1]) - offsets[series]
+    return offsets, series, first[series] + local, local >= lengths[series]
+
+
+def _series_days(offsets, series, ordinals, separator, last):
+    """
+    Day attributes over laid out series, as the single tracker engine sees them for a calendar
+    running from the first to the last day of the user. Separator rows are missed Mondays in a later
+    week and month, so they close whatever streak is still open.
+    """
+    shift = series.astype(np.int64) * SERIES_GAP
+    end = last[series]
+    weekday = ((ordinals + 3) % 7).astype(np.int8)
+    month = ordinals.astype('datetime64[D]').astype('datetime64[M]')
+    month_last = ((month + 1).astype('datetime64[D]') - np.timedelta64(1, 'D')).astype(np.int64)
+
+    last_month = end.astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+    days = {
+        'weekday': np.where(separator, 0, weekday).astype(np.int8),
+        'week': (np.where(separator, week_index(end) + 2, week_index(ordinals)) + shift).astype(float),
+        'week_days_left': np.where(separator, 0, 6 - weekday),
+        'month': np.where(separator, last_month + 2, month.astype(np.int64)) + shift,
+        'month_days_left': np.where(separator, 0, month_last - ordinals),
+    }
+    return days
+
+
+def _rule_streaks(habit_freq, first, last, facts_series, facts_ordinals):
+    """Streaks of every series sharing one frequency, from a single kernel call"""
+    rule = frequency_rule(habit_freq)
+    pad = rule.every if rule is not None and rule.period == 'day' else 1
+    offsets, series, ordinals, separator = _series_layout(first, last, pad)
+
+    done = np.zeros(len(series), dtype=bool)
+    done[offsets[facts_series] + facts_ordinals - first[facts_series]] = True
+
+    if rule is None:
+        warn_unknown_frequency(habit_freq)
+        # unknown frequencies open one streak at the first completion of each series that never closes
+        done_rows = np.flatnonzero(done)
+        starts = done_rows[np.unique(series[done_rows], return_index=True)[1]]
+        ones = np.ones(len(starts), dtype=np.int64)
+        return series[starts], ordinals[starts], ordinals[starts], ones, ones * 0, ones.astype(bool)
+
+    days = _series_days(offsets, series, ordinals, separator, last)
+    starts, ends, counts, extras, active, closes, counted = compile_rule(rule)(done, days)
+    owner = series[starts]
+    # a streak closed by the separator was still active on the last day of its series
+    active = closes >= offsets[owner] + (last - first + 1)[owner]
+    return owner, ordinals[starts], ordinals[ends], counts, extras, active
+
+
+def calculate_streaks_long(facts_df, habits_df, user_column='user_id', habit_column='Attribute',
+                           date_column='Date', value_column='Value'):
+    """
+    Streaks for many users at once from one long-format table (user, habit, date, value),
+    the shape produced by unpivoting the trackers.
+    habits_df lists 'Short Name' and 'Frequency', per user when it has the user column.
+    Each user's calendar runs from their first to their last date and missing days are not done,
+    as in the single tracker run. Every frequency runs through its kernel once for all users.
+    Returns the streaks_df columns with the user column in front; ids are numbered per user.
+    """
+    per_user = user_column in habits_df.columns
+    keys = [user_column, 'Short Name'] if per_user else ['Short Name']
+    habits = habits_df.drop_duplicates(keys)[keys + ['Frequency']].copy()
+    habits['habit_pos'] = habits.groupby(user_column).cumcount() if per_user else np.arange(len(habits))
+
+    facts = pd.DataFrame({
+        user_column: facts_df[user_column].to_numpy(),
+        'Short Name': facts_df[habit_column].to_numpy(),
+        'ordinal': day_ordinals(facts_df[date_column]),
+        'done': _done_values(facts_df, value_column),
+    })
+    user_first = facts.groupby(user_column)['ordinal'].min()
+    user_last = facts.groupby(user_column)['ordinal'].max()
+
+    facts = facts.merge(habits, on=keys)
+    # one series per (user, habit); duplicate dates of a habit are done when any row is done
+    facts = facts[facts['done']].drop_duplicates([user_column, 'Short Name', 'ordinal'])
+    series = facts[[user_column, 'Short Name', 'Frequency', 'habit_pos']].drop_duplicates([user_column, 'Short Name'])
+    series = series.reset_index(drop=True)
+    series['first'] = user_first.reindex(series[user_column]).to_numpy()
+    series['last'] = user_last.reindex(series[user_column]).to_numpy()
+    facts = facts.merge(series[[user_column, 'Short Name']].reset_index(), on=[user_column, 'Short Name'])
+
+    frames = []
+    for habit_freq, group in series.groupby('Frequency', sort=False, dropna=False):
+        local = pd.Series(np.arange(len(group)), index=group.index)
+        rule_facts = facts[facts['index'].isin(group.index)]
+        owner, start, end, counts, extras, active = _rule_streaks(
+            habit_freq, group['first'].to_numpy(dtype=np.int64), group['last'].to_numpy(dtype=np.int64),
+            local.loc[rule_facts['index']].to_numpy(), rule_facts['ordinal'].to_numpy(dtype=np.int64))
+        rows = group.iloc[owner]
+        frames.append(pd.DataFrame({
+            user_column: rows[user_column].to_numpy(),
+            'habit_pos': rows['habit_pos'].to_numpy(),
+            'name': rows['Short Name'].to_numpy(),
+            'start': start,
+            'end': end,
+            'streak_count': counts,
+            'extra': extras,
+            'active': active,
+        }))
+
+    if not frames:
+        return pd.DataFrame(columns=[user_column] + STREAK_COLUMNS)
+    streaks = pd.concat(frames, ignore_index=True).sort_values([user_column, 'start', 'habit_pos'], kind='stable')
+    streaks['id'] = streaks.groupby(user_column).cumcount() + 1
+    streaks['start_date'] = streaks['start'].to_numpy().astype('datetime64[D]').astype('datetime64[ns]')
+    streaks['end_date'] = streaks['end'].to_numpy().astype('datetime64[D]').astype('datetime64[ns]')
+    return streaks[[user_column] + STREAK_COLUMNS].reset_index(drop=True)
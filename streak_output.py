@@ -0,0 +1,109 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.feather
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError('Writing Parquet or Arrow files requires pyarrow: pip install pyarrow')
+    return pyarrow
+
+
+def _date32(pa, values):
+    return pa.array(pd.to_datetime(values).to_numpy().astype('datetime64[D]'), type=pa.date32())
+
+
+def streaks_table(streaks_df):
+    """Arrow table of the streaks with a typed schema"""
+    pa = _pyarrow()
+    return pa.table({
+        'id': pa.array(streaks_df['id'].to_numpy(dtype=np.int32), type=pa.int32()),
+        'name': pa.array(streaks_df['name'].astype(str), type=pa.string()).dictionary_encode(),
+        'start_date': _date32(pa, streaks_df['start_date']),
+        'end_date': _date32(pa, streaks_df['end_date']),
+        'streak_count': pa.array(streaks_df['streak_count'].to_numpy(dtype=np.int32), type=pa.int32()),
+        'extra': pa.array(streaks_df['extra'].to_numpy(dtype=np.int32), type=pa.int32()),
+        'active': pa.array(streaks_df['active'].to_numpy(dtype=bool), type=pa.bool_()),
+    })
+
+
+def streak_series_table(series_df):
+    """Arrow table of the per-day streak series"""
+    pa = _pyarrow()
+    return pa.table({
+        'Date': _date32(pa, series_df['Date']),
+        'name': pa.DictionaryArray.from_arrays(
+            pa.array(series_df['name'].cat.codes.to_numpy(dtype=np.int32)),
+            pa.array(list(series_df['name'].cat.categories), type=pa.string())),
+        'streak': pa.array(series_df['streak'].to_numpy(dtype=np.int32), type=pa.int32()),
+        'longest': pa.array(series_df['longest'].to_numpy(dtype=np.int32), type=pa.int32()),
+        'alive': pa.array(series_df['alive'].to_numpy(dtype=bool), type=pa.bool_()),
+    })
+
+
+def habit_facts(daily_habit_tracker_df, habits_df):
+    """
+    Long format habit facts (Date, Attribute, Value), the same shape as the Power Query unpivot.
+    Attribute is categorical; Value is 1/0 for checks and the number for value habits,
+    stored as int8 when every value fits and float32 otherwise.
+    """
+    habits = [h for h in habits_df['Short Name'].drop_duplicates() if h in daily_habit_tracker_df.columns]
+    dates = pd.to_datetime(daily_habit_tracker_df['Date']).to_numpy()
+
+    columns = []
+    for habit in habits:
+        column = daily_habit_tracker_df[habit]
+        if column.dtype == bool or column.dtype == object:
+            column = column.replace(['', None], np.nan).fillna(0).astype(float)
+        columns.append(column.to_numpy(dtype=np.float64))
+    values = np.stack(columns, axis=1).ravel() if columns else np.zeros(0)
+
+    fits_int8 = np.all(np.isfinite(values)) and np.all(values == np.round(values)) \
+        and (values.size == 0 or (values.min() >= -128 and values.max() <= 127))
+    return pd.DataFrame({
+        'Date': np.repeat(dates, len(habits)),
+        'Attribute': pd.Categorical.from_codes(np.tile(np.arange(len(habits)), len(dates)), categories=habits),
+        'Value': values.astype(np.int8 if fits_int8 else np.float32),
+    })
+
+
+def habit_facts_table(facts_df):
+    pa = _pyarrow()
+    return pa.table({
+        'Date': _date32(pa, facts_df['Date']),
+        'Attribute': pa.DictionaryArray.from_arrays(
+            pa.array(facts_df['Attribute'].cat.codes.to_numpy(dtype=np.int32)),
+            pa.array(list(facts_df['Attribute'].cat.categories), type=pa.string())),
+        'Value': pa.array(facts_df['Value'].to_numpy()),
+    })
+
+
+def write_table(table, path):
+    """
+    Write an Arrow table as Parquet, or as Arrow IPC (Feather) for .arrow / .feather paths.
+    The file is replaced atomically so readers such as the query service never see a partial file.
+    """
+    pa = _pyarrow()
+    tmp_path = path + '.tmp'
+    if path.endswith('.arrow') or path.endswith('.feather'):
+        pa.feather.write_feather(table, tmp_path, compression='zstd')
+    else:
+        pa.parquet.write_table(table, tmp_path, compression='zstd')
+    os.replace(tmp_path, path)
+
+
+def write_streaks(streaks_df, path):
+    write_table(streaks_table(streaks_df), path)
+
+
+def write_habit_facts(daily_habit_tracker_df, habits_df, path):
+    write_table(habit_facts_table(habit_facts(daily_habit_tracker_df, habits_df)), path)
+
+
+def write_streak_series(series_df, path):
+    write_table(streak_series_table(series_df), path)
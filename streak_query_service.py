@@ -0,0 +1,207 @@
+import json
+import os
+import socketserver
+import threading
+from configparser import ConfigParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+from calendar_index import day_ordinals
+
+DEFAULT_PORT = 8765
+
+# end ordinal used for active streaks, which keep going past their last counted day
+OPEN_END = np.iinfo(np.int64).max
+
+
+def date_ordinal(date):
+    """Day ordinal of a YYYY-MM-DD date; raises ValueError for anything else"""
+    return int(np.datetime64(str(date)[:10], 'D').astype(np.int64))
+
+
+def read_streaks(path):
+    """Streaks from the CSV output, or from the Parquet / Arrow output for those extensions"""
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path)
+    if path.endswith('.arrow') or path.endswith('.feather'):
+        return pd.read_feather(path)
+    return pd.read_csv(path, parse_dates=['start_date', 'end_date'])
+
+
+class StreakIndex:
+    """
+    Streaks of every habit as sorted interval arrays of day ordinals.
+    Streaks of one habit never overlap, so both starts and ends are sorted and lookups are binary searches.
+    """
+
+    def __init__(self, streaks_df):
+        self.habits = {}
+        if len(streaks_df) == 0:
+            return
+        streaks_df = streaks_df.assign(start=day_ordinals(streaks_df['start_date']),
+                                       end=day_ordinals(streaks_df['end_date']))
+        for habit, streaks in streaks_df.groupby('name', sort=False):
+            streaks = streaks.sort_values('start', kind='stable')
+            active = streaks['active'].astype(str).str.lower().eq('true').to_numpy()
+            self.habits[str(habit)] = {
+                'id': streaks['id'].to_numpy(dtype=np.int64),
+                'start': streaks['start'].to_numpy(),
+                'end': streaks['end'].to_numpy(),
+                'alive_until': np.where(active, OPEN_END, streaks['end'].to_numpy()),
+                'streak_count': streaks['streak_count'].to_numpy(dtype=np.int64),
+                'extra': streaks['extra'].to_numpy(dtype=np.int64),
+                'active': active,
+            }
+
+    def _streak(self, habit, i):
+        streaks = self.habits[habit]
+        return {
+            'id': int(streaks['id'][i]),
+            'name': habit,
+            'start_date': str(np.datetime64(int(streaks['start'][i]), 'D')),
+            'end_date': str(np.datetime64(int(streaks['end'][i]), 'D')),
+            'streak_count': int(streaks['streak_count'][i]),
+            'extra': int(streaks['extra'][i]),
+            'active': bool(streaks['active'][i]),
+        }
+
+    def _get(self, habit):
+        if habit not in self.habits:
+            raise KeyError(f'Unknown habit {habit}')
+        return self.habits[habit]
+
+    def current(self, habit):
+        """The active streak of a habit, or None"""
+        streaks = self._get(habit)
+        if not len(streaks['active']) or not streaks['active'][-1]:
+            return None
+        return self._streak(habit, len(streaks['active']) - 1)
+
+    def longest(self, habit):
+        """The streak with the highest count; the earliest one wins a tie"""
+        streaks = self._get(habit)
+        if not len(streaks['streak_count']):
+            return None
+        return self._streak(habit, int(np.argmax(streaks['streak_count'])))
+
+    def at(self, habit, date):
+        """The streak alive on a date, or None"""
+        streaks = self._get(habit)
+        ordinal = date_ordinal(date)
+        i = int(np.searchsorted(streaks['start'], ordinal, side='right')) - 1
+        if i < 0 or streaks['alive_until'][i] < ordinal:
+            return None
+        return self._streak(habit, i)
+
+    def between(self, start, end, habit=None):
+        """Streaks overlapping the inclusive date range, for one habit or all of them"""
+        first, last = date_ordinal(start), date_ordinal(end)
+        result = []
+        for name in ([habit] if habit is not None else list(self.habits)):
+            streaks = self._get(name)
+            lo = int(np.searchsorted(streaks['alive_until'], first, side='left'))
+            hi = int(np.searchsorted(streaks['start'], last, side='right'))
+            result.extend(self._streak(name, i) for i in range(lo, hi))
+        return result
+
+
+class StreakStore:
+    """Holds the index for a streaks file and swaps in a new one when the file changes"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.mtime = None
+        self.index = StreakIndex(pd.DataFrame())
+        self.reload()
+
+    def reload(self):
+        """Rebuild the index if the file changed; readers keep the old index until the new one is ready"""
+        with self.lock:
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+            except FileNotFoundError:
+                return self.index
+            if mtime != self.mtime:
+                try:
+                    index = StreakIndex(read_streaks(self.path))
+                except Exception as e:
+                    # keep answering from the previous index and try again on the next request
+                    print(f"Could not reload {self.path}, keeping the previous streaks: {e}")
+                    return self.index
+                self.index = index
+                self.mtime = mtime
+            return self.index
+
+
+def answer(index, path, query):
+    """Result of one query as a JSON compatible value"""
+    habit = query.get('habit')
+    if path == '/habits':
+        return list(index.habits)
+    if path == '/current':
+        return index.current(habit)
+    if path == '/longest':
+        return index.longest(habit)
+    if path == '/at':
+        return index.at(habit, query['date'])
+    if path == '/range':
+        return index.between(query['start'], query['end'], habit)
+    raise LookupError(path)
+
+
+class StreakQueryHandler(BaseHTTPRequestHandler):
+    store = None
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        index = self.store.reload()
+        try:
+            status, body = 200, answer(index, url.path, query)
+        except LookupError as e:
+            # KeyError for unknown habits or missing parameters, LookupError for unknown paths
+            status, body = 404, {'error': str(e)}
+        except ValueError as e:
+            status, body = 400, {'error': str(e)}
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def address_string(self):
+        # unix socket clients have no address
+        return self.client_address[0] if self.client_address else 'unix'
+
+    def log_message(self, format, *args):
+        pass
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def make_server(streaks_file, port=DEFAULT_PORT, host='127.0.0.1', socket_path=None):
+    handler = type('Handler', (StreakQueryHandler,), {'store': StreakStore(streaks_file)})
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        return UnixHTTPServer(socket_path, handler)
+    return ThreadingHTTPServer((host, port), handler)
+
+
+if __name__ == '__main__':
+    config = ConfigParser()
+    config.read('config.ini')
+    streaks_file = config.get('resources', 'query_service_file', fallback=None) or config['resources']['streaks_file']
+    server = make_server(streaks_file,
+                         port=config.getint('resources', 'query_service_port', fallback=DEFAULT_PORT),
+                         host=config.get('resources', 'query_service_host', fallback='127.0.0.1'),
+                         socket_path=config.get('resources', 'query_service_socket', fallback=None))
+    print("Serving streak queries from", streaks_file)
+    server.serve_forever()
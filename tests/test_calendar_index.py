@@ -0,0 +1,38 @@
+import pandas as pd
+import pytest
+
+from calendar_index import CalendarIndex, generate_calendar
+from fake_notion_server import FakeNotion, start_server
+from main import NotionSync, fetch_tracker_tables, prepare_tracker
+from notion_client import NotionClient
+from notion_fixtures import habit_names
+from streak_engine import calculate_streaks
+
+TRACKER_ID = '00000000000000000000000000000000'
+HABITS_ID = '000000000000000000000000000000aa'
+
+
+@pytest.fixture
+def nsync():
+    # 2025-01-01 to Tuesday 2025-01-21, the last 3x-a-Week habit done Monday, Wednesday and Friday only
+    notion = FakeNotion.generated(days=21, habits=6)
+    habit = habit_names(6)[5]
+    for page in notion.databases[TRACKER_ID]['pages']:
+        weekday = pd.Timestamp(page['properties']['Date']['date']['start']).dayofweek
+        page['properties'][habit] = {'id': 'c5', 'type': 'checkbox', 'checkbox': weekday in (0, 2, 4)}
+    server, base_url = start_server(notion)
+    yield NotionSync(client=NotionClient('secret', base_url=base_url, rate=100))
+    server.shutdown()
+    server.server_close()
+
+
+def test_generated_calendar_ending_mid_week_matches_full_calendar(nsync):
+    tracker_df, habits_df = fetch_tracker_tables(nsync, TRACKER_ID, HABITS_ID)
+    tracker_df, calendar_index = prepare_tracker(tracker_df, habits_df)
+    generated = calculate_streaks(tracker_df, habits_df, calendar_index)
+    full = calculate_streaks(tracker_df, habits_df, CalendarIndex(generate_calendar('2025-01-01', '2025-12-31')))
+    pd.testing.assert_frame_equal(generated, full)
+
+    # Tuesday is missed, but the week can still reach three completions
+    three_a_week = generated[generated['name'] == habit_names(6)[5]]
+    assert three_a_week['active'].tolist()[-1]
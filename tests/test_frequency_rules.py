@@ -0,0 +1,54 @@
+import pandas as pd
+import pytest
+
+from calendar_index import CalendarIndex
+from streak_engine import calculate_streaks
+from streak_long import calculate_streaks_long
+
+
+def twice_a_month(end):
+    """2x-a-Month habit met in January, with nothing done yet in February"""
+    dates = pd.date_range('2025-01-01', end)
+    done = dates.isin(pd.to_datetime(['2025-01-05', '2025-01-20']))
+    habits_df = pd.DataFrame({'Short Name': ['H'], 'Frequency': ['2x-a-Month'], 'Check': ['Check']})
+    return dates, done, habits_df
+
+
+@pytest.mark.parametrize('end, active', [('2025-02-03', True), ('2025-02-28', False)])
+def test_partial_final_month_keeps_streak_open(end, active):
+    dates, done, habits_df = twice_a_month(end)
+    tracker = pd.DataFrame({'Date': dates, 'H': done})
+    streaks = calculate_streaks(tracker, habits_df, CalendarIndex.from_range(dates[0], dates[-1]))
+    assert streaks['streak_count'].tolist() == [2]
+    assert streaks['active'].tolist() == [active]
+
+
+@pytest.mark.parametrize('end, active', [('2025-02-03', True), ('2025-02-28', False)])
+def test_partial_final_month_keeps_streak_open_long(end, active):
+    dates, done, habits_df = twice_a_month(end)
+    facts = pd.DataFrame({'user_id': 1, 'Attribute': 'H', 'Date': dates, 'Value': done})
+    streaks = calculate_streaks_long(facts, habits_df)
+    assert streaks['streak_count'].tolist() == [2]
+    assert streaks['active'].tolist() == [active]
+
+
+def test_monthly_is_once_a_month():
+    dates = pd.date_range('2025-01-01', '2025-04-30')
+    done = dates.isin(pd.to_datetime(['2025-01-31', '2025-02-01', '2025-03-15']))
+    tracker = pd.DataFrame({'Date': dates, 'M': done, 'N': done})
+    habits_df = pd.DataFrame({'Short Name': ['M', 'N'], 'Frequency': ['Monthly', '1x-a-Month'], 'Check': 'Check'})
+    streaks = calculate_streaks(tracker, habits_df, CalendarIndex.from_range(dates[0], dates[-1]))
+    monthly, once = streaks[streaks['name'] == 'M'], streaks[streaks['name'] == 'N']
+    assert monthly['streak_count'].tolist() == once['streak_count'].tolist() == [3]
+    assert monthly['active'].tolist() == [True]
+
+
+def test_unknown_frequency_warns_once(capsys):
+    dates = pd.date_range('2025-01-01', periods=10)
+    tracker = pd.DataFrame({'Date': dates, 'A': True, 'B': True})
+    habits_df = pd.DataFrame({'Short Name': ['A', 'B'], 'Frequency': ['Fortnightly'] * 2, 'Check': 'Check'})
+    calendar = CalendarIndex.from_range(dates[0], dates[-1])
+    streaks = calculate_streaks(tracker, habits_df, calendar)
+    calculate_streaks(tracker, habits_df, calendar)
+    assert capsys.readouterr().out.count("Frequency 'Fortnightly' is not known") == 1
+    assert streaks['active'].tolist() == [True, True]
@@ -0,0 +1,50 @@
+import pytest
+
+from fake_notion_server import FakeNotion, start_server
+from notion_client import NotionAPIError, NotionClient
+
+TRACKER_ID = '00000000000000000000000000000000'
+
+
+@pytest.fixture
+def notion():
+    # throttles beyond 20 requests a second and fails about a third of the rest with a 503
+    notion = FakeNotion.generated(days=60, habits=6, page_size=5, rate=20, burst=2, error_rate=0.3,
+                                  error_status=503)
+    server, notion.base_url = start_server(notion)
+    yield notion
+    server.shutdown()
+    server.server_close()
+
+
+def query_all(client):
+    pages, cursor = [], None
+    while True:
+        body = {'start_cursor': cursor} if cursor else {}
+        response = client.post(f'/databases/{TRACKER_ID}/query', body)
+        pages.extend(response['results'])
+        if not response['has_more']:
+            return pages
+        cursor = response['next_cursor']
+
+
+def test_retries_throttled_and_failed_requests(notion):
+    client = NotionClient('secret', base_url=notion.base_url, rate=100, burst=5, max_retries=10)
+    assert len(query_all(client)) == 60
+
+    stats = client.stats()
+    assert notion.stats['throttled'] > 0 and notion.stats['errors'] > 0
+    assert stats['requests'] == notion.stats['requests']
+    # every throttled or failed response was retried until the page came back
+    assert stats['errors'] == notion.stats['throttled'] + notion.stats['errors']
+    assert stats['retries'] == stats['errors']
+    assert stats['requests'] == 12 + stats['errors']
+
+
+def test_gives_up_after_max_retries(notion):
+    notion.error_rate = 1.0
+    client = NotionClient('secret', base_url=notion.base_url, rate=100, max_retries=2)
+    with pytest.raises(NotionAPIError) as error:
+        client.post(f'/databases/{TRACKER_ID}/query', {})
+    assert error.value.status_code == 503
+    assert client.stats()['requests'] == 3 and client.stats()['retries'] == 2
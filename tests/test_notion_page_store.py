@@ -0,0 +1,62 @@
+import pytest
+
+from fake_notion_server import FakeNotion, start_server
+from main import NotionSync, fetch_table
+from notion_client import NotionClient
+from notion_page_store import NotionPageStore
+
+TRACKER_ID = '00000000000000000000000000000000'
+
+
+@pytest.fixture
+def notion():
+    notion = FakeNotion.generated(days=50, habits=6)
+    server, base_url = start_server(notion)
+    notion.nsync = NotionSync(client=NotionClient('secret', base_url=base_url, rate=100))
+    yield notion
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = NotionPageStore(str(tmp_path / 'pages.sqlite'), full_refresh_after=3600)
+    yield store
+    store.close()
+
+
+def sync(notion, store, projection=None):
+    """Rows synced through the page store and the response bytes it took"""
+    before = notion.stats['bytes']
+    table = fetch_table(notion.nsync, TRACKER_ID, projection, page_store=store)
+    return table, notion.stats['bytes'] - before
+
+
+def test_projection_change_downloads_again(notion, store):
+    table, full_bytes = sync(notion, store)
+    assert 'Status' in table
+    _, changed_bytes = sync(notion, store)
+    assert changed_bytes < full_bytes / 10
+
+    # pages stored with every property cannot serve a narrower projection, or the reverse
+    projection = notion.nsync.notion_db_projection(TRACKER_ID, exclude=['Status'])
+    table, projected_bytes = sync(notion, store, projection)
+    assert 'Status' not in table and len(table['Date']) == 50
+    assert projected_bytes > full_bytes / 2
+    _, changed_bytes = sync(notion, store, projection)
+    assert changed_bytes < projected_bytes / 10
+
+    table, _ = sync(notion, store)
+    assert 'Status' in table and len(table['Date']) == 50
+
+
+def test_expired_full_refresh_drops_trashed_pages(notion, store):
+    sync(notion, store)
+    # trashed pages are never returned by the filtered incremental queries
+    notion.databases[TRACKER_ID]['pages'].pop(10)
+    table, _ = sync(notion, store)
+    assert len(table['Date']) == 50
+
+    store.full_refresh_after = 0
+    table, _ = sync(notion, store)
+    assert len(table['Date']) == 49
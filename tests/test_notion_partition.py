@@ -0,0 +1,42 @@
+import threading
+
+import pytest
+
+from notion_partition import read_ahead
+
+
+def producer_threads():
+    return {thread for thread in threading.enumerate() if thread is not threading.current_thread()}
+
+
+def wait_for(threads):
+    for thread in threads:
+        thread.join(timeout=5)
+    return [thread for thread in threads if thread.is_alive()]
+
+
+def test_read_ahead_keeps_order_and_raises_producer_errors():
+    assert list(read_ahead(iter(range(10)), depth=2)) == list(range(10))
+
+    def failing():
+        yield 1
+        raise ValueError('page decode failed')
+
+    with pytest.raises(ValueError):
+        list(read_ahead(failing()))
+
+
+def test_read_ahead_producer_stops_when_caller_closes_early():
+    before = producer_threads()
+    batches = read_ahead(iter(range(1000)))
+    assert next(batches) == 0
+    batches.close()
+    assert wait_for(producer_threads() - before) == []
+
+
+def test_read_ahead_producer_stops_when_caller_raises():
+    before = producer_threads()
+    with pytest.raises(KeyError):
+        for batch in read_ahead(iter(range(1000))):
+            raise KeyError(batch)
+    assert wait_for(producer_threads() - before) == []
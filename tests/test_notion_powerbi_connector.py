@@ -0,0 +1,59 @@
+import configparser
+
+import pytest
+
+import notion_powerbi_connector
+from fake_notion_server import FakeNotion, start_server
+
+TRACKER_ID = '00000000000000000000000000000000'
+
+
+@pytest.fixture
+def notion():
+    notion = FakeNotion.generated(days=60, habits=6)
+    server, base_url = start_server(notion)
+    notion.base_url = base_url
+    yield notion
+    server.shutdown()
+    server.server_close()
+
+
+def use_config(monkeypatch, notion, tables=None, **resources):
+    """Point the connector at the fake server with these config.ini settings"""
+    config = configparser.ConfigParser()
+    config.read_dict({
+        'secret': {'token': 'secret'},
+        'tables': dict({'daily_habit_tracker': TRACKER_ID}, **(tables or {})),
+        'resources': dict({'notion_base_url': notion.base_url, 'notion_rate_limit': '100'}, **resources),
+    })
+    monkeypatch.setattr(notion_powerbi_connector, 'load_config', lambda: config)
+
+
+def test_failed_snapshot_write_still_returns_rows(monkeypatch, notion, tmp_path):
+    use_config(monkeypatch, notion, snapshot_file=str(tmp_path / 'missing' / 'snapshot.feather'))
+    df = notion_powerbi_connector.fetch_notion_table_data()
+    assert len(df) == 60
+    assert not (tmp_path / 'missing').exists()
+
+
+def test_snapshot_only_serves_the_same_source_and_projection(monkeypatch, notion, tmp_path):
+    snapshot_file = str(tmp_path / 'snapshot.feather')
+    use_config(monkeypatch, notion, snapshot_file=snapshot_file)
+    full = notion_powerbi_connector.fetch_notion_table_data()
+    requests = notion.stats['requests']
+    assert notion_powerbi_connector.fetch_notion_table_data().equals(full)
+    assert notion.stats['requests'] == requests
+
+    # another projection is fetched again rather than served from the snapshot
+    use_config(monkeypatch, notion, snapshot_file=snapshot_file, exclude_properties='Status')
+    projected = notion_powerbi_connector.fetch_notion_table_data()
+    assert notion.stats['requests'] > requests
+    assert 'Status' in full.columns and 'Status' not in projected.columns
+
+    # and so is another data source
+    requests = notion.stats['requests']
+    use_config(monkeypatch, notion, tables={'daily_habit_tracker_data_source': '000000000000000000000000000000aa'},
+               snapshot_file=snapshot_file, exclude_properties='Status')
+    habits = notion_powerbi_connector.fetch_notion_table_data()
+    assert notion.stats['requests'] > requests
+    assert len(habits) == 6
@@ -0,0 +1,143 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from habit_matrix import HabitMatrix
+from streak_checkpoint import calculate_streaks_incremental, load_checkpoint, load_streaks, save_checkpoint
+from streak_engine import STREAK_COLUMNS, calculate_streaks
+
+HABITS = pd.DataFrame({
+    'Short Name': ['a', 'b', 'c', 'd', 'e', 'f', 'g'],
+    'Frequency': ['Daily', 'Weekdays', 'Weekly', '3x-a-Week', '3x-a-Week', 'Weekly', 'Someday'],
+    'Check': ['Check'] * 7,
+})
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
+
+
+def legacy_streaks(daily_habit_tracker_df, habits_df, calendar_df):
+    """The row by row streak loop the vectorized engine replaced, kept as the reference"""
+    streaks_df = pd.DataFrame(columns=STREAK_COLUMNS)
+    streak_id = 1
+
+    def day_of_week(date):
+        return calendar_df.loc[calendar_df['date'] == date, 'day_of_week_name'].values[0]
+
+    def week_number(date):
+        return calendar_df.loc[calendar_df['date'] == date, 'week_number'].values[0]
+
+    def days_left_in_week(week, date):
+        week_dates = calendar_df[calendar_df['week_number'] == week]
+        return len(week_dates[week_dates['date'] > date])
+
+    for _, row in daily_habit_tracker_df.iterrows():
+        date = row['Date']
+        for habit in habits_df['Short Name']:
+            habit_freq = habits_df.loc[habits_df['Short Name'] == habit, 'Frequency'].values[0]
+            habit_done = row.get(habit, None)
+            active_streak = streaks_df[(streaks_df['name'] == habit) & (streaks_df['active'] == True)]
+
+            if habit_done:
+                if not active_streak.empty:
+                    i = active_streak.index[0]
+                    if habit_freq == 'Daily':
+                        streaks_df.at[i, 'streak_count'] += 1
+                        streaks_df.at[i, 'end_date'] = date
+                    elif habit_freq == 'Weekdays':
+                        if day_of_week(date) in WEEKDAYS:
+                            streaks_df.at[i, 'streak_count'] += 1
+                            streaks_df.at[i, 'end_date'] = date
+                        else:
+                            streaks_df.at[i, 'extra'] += 1
+                    elif habit_freq == 'Weekly':
+                        end_week = week_number(streaks_df.at[i, 'end_date'])
+                        if week_number(date) == end_week:
+                            streaks_df.at[i, 'extra'] += 1
+                        elif week_number(date) == end_week + 1:
+                            streaks_df.at[i, 'streak_count'] += 1
+                            streaks_df.at[i, 'end_date'] = date
+                    elif habit_freq == '3x-a-Week':
+                        start_week = week_number(streaks_df.at[i, 'start_date'])
+                        target = (week_number(date) - start_week + 1) * 3
+                        if streaks_df.at[i, 'streak_count'] < target:
+                            streaks_df.at[i, 'streak_count'] += 1
+                            streaks_df.at[i, 'end_date'] = date
+                        elif streaks_df.at[i, 'streak_count'] == target:
+                            streaks_df.at[i, 'extra'] += 1
+                else:
+                    weekend = habit_freq == 'Weekdays' and day_of_week(date) in ['Saturday', 'Sunday']
+                    new_streak = pd.DataFrame([{
+                        'id': streak_id, 'name': habit, 'start_date': date, 'end_date': date,
+                        'streak_count': 0 if weekend else 1, 'extra': 1 if weekend else 0, 'active': True,
+                    }])
+                    streaks_df = pd.concat([streaks_df, new_streak], ignore_index=True)
+                    streak_id += 1
+            elif not active_streak.empty:
+                i = active_streak.index[0]
+                if habit_freq == 'Daily':
+                    streaks_df.at[i, 'active'] = False
+                elif habit_freq == 'Weekdays':
+                    if day_of_week(date) in WEEKDAYS:
+                        streaks_df.at[i, 'active'] = False
+                elif habit_freq == 'Weekly':
+                    if week_number(date) >= week_number(streaks_df.at[i, 'end_date']) + 2:
+                        streaks_df.at[i, 'active'] = False
+                elif habit_freq == '3x-a-Week':
+                    week = week_number(date)
+                    target = (week - week_number(streaks_df.at[i, 'start_date']) + 1) * 3
+                    if streaks_df.at[i, 'streak_count'] + days_left_in_week(week, date) < target:
+                        streaks_df.at[i, 'active'] = False
+    return streaks_df
+
+
+def random_tracker(seed, days):
+    """Random completions for every habit, with a full calendar running past the last tracked day"""
+    rng = np.random.default_rng(seed)
+    calendar_dates = pd.date_range('2025-01-01', periods=days + 14, freq='D')
+    calendar_df = pd.DataFrame({
+        'date': calendar_dates,
+        'day_of_week_name': calendar_dates.day_name(),
+        'week_number': (calendar_dates - pd.Timestamp('2024-12-30')).days // 7 + 1,
+    })
+    tracker = pd.DataFrame({'Date': calendar_dates[:days]})
+    for habit, p in zip(HABITS['Short Name'], rng.uniform(0.2, 0.9, len(HABITS))):
+        tracker[habit] = rng.random(days) < p
+    return tracker, calendar_df
+
+
+def normalized(streaks_df):
+    streaks_df = streaks_df[STREAK_COLUMNS].reset_index(drop=True)
+    return streaks_df.astype({'id': int, 'name': str, 'streak_count': int, 'extra': int, 'active': bool}).assign(
+        start_date=pd.to_datetime(streaks_df['start_date']).astype('datetime64[ns]'),
+        end_date=pd.to_datetime(streaks_df['end_date']).astype('datetime64[ns]'))
+
+
+@pytest.mark.parametrize('seed', range(6))
+def test_calculate_streaks_matches_legacy_loop(seed):
+    tracker, calendar_df = random_tracker(seed, days=50 + 11 * seed)
+    expected = normalized(legacy_streaks(tracker, HABITS, calendar_df))
+    pd.testing.assert_frame_equal(normalized(calculate_streaks(tracker, HABITS, calendar_df)), expected)
+    matrix = HabitMatrix.from_frame(tracker, HABITS)
+    pd.testing.assert_frame_equal(normalized(calculate_streaks(matrix, HABITS, calendar_df)), expected)
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_incremental_matches_full_recompute(seed, tmp_path):
+    rng = np.random.default_rng(seed + 100)
+    tracker, calendar_df = random_tracker(seed, days=150)
+    first_run = int(rng.integers(40, 140))
+
+    # first run, written and read back the way main.py keeps its output
+    streaks_df, checkpoint = calculate_streaks_incremental(tracker.iloc[:first_run], HABITS, calendar_df)
+    streaks_file = str(tmp_path / 'streaks.csv')
+    streaks_df.to_csv(streaks_file, index=False)
+    save_checkpoint(checkpoint, streaks_file + '.checkpoint.json')
+
+    # later run: new days appended and some past days edited
+    changed = tracker.iloc[:first_run + int(rng.integers(0, 10))].copy()
+    for _ in range(int(rng.integers(0, 5))):
+        row, habit = first_run - 1 - int(rng.integers(0, 30)), HABITS['Short Name'][int(rng.integers(0, 7))]
+        changed.iloc[row, changed.columns.get_loc(habit)] = not changed.iloc[row][habit]
+
+    incremental, _ = calculate_streaks_incremental(changed, HABITS, calendar_df, load_streaks(streaks_file),
+                                                   load_checkpoint(streaks_file + '.checkpoint.json'))
+    pd.testing.assert_frame_equal(normalized(incremental), normalized(calculate_streaks(changed, HABITS, calendar_df)))
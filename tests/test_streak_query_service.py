@@ -0,0 +1,67 @@
+import json
+import os
+import threading
+from urllib.request import urlopen
+
+import pytest
+
+from fake_notion_server import FakeNotion, start_server
+from main import NotionSync, fetch_tracker_tables, prepare_tracker
+from notion_client import NotionClient
+from streak_engine import calculate_streaks
+from streak_output import write_streaks
+from streak_query_service import make_server
+
+TRACKER_ID = '00000000000000000000000000000000'
+HABITS_ID = '000000000000000000000000000000aa'
+
+
+@pytest.fixture
+def streaks_df():
+    """Streaks of a tracker fetched from the fake Notion server"""
+    notion = FakeNotion.generated(days=90, habits=6)
+    server, base_url = start_server(notion)
+    try:
+        nsync = NotionSync(client=NotionClient('secret', base_url=base_url, rate=100))
+        tracker_df, habits_df = fetch_tracker_tables(nsync, TRACKER_ID, HABITS_ID)
+    finally:
+        server.shutdown()
+        server.server_close()
+    tracker_df, calendar_index = prepare_tracker(tracker_df, habits_df)
+    return calculate_streaks(tracker_df, habits_df, calendar_index)
+
+
+def get(base_url, path):
+    with urlopen(base_url + path) as response:
+        return json.load(response)
+
+
+def touch(path, step):
+    # mtimes can repeat within the file system resolution, make each rewrite visible
+    mtime = os.stat(path).st_mtime_ns + step * 10 ** 9
+    os.utime(path, ns=(mtime, mtime))
+
+
+def test_failed_reload_keeps_the_previous_index(streaks_df, tmp_path):
+    path = str(tmp_path / 'streaks.parquet')
+    write_streaks(streaks_df, path)
+    server = make_server(path, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://{server.server_address[0]}:{server.server_address[1]}'
+    try:
+        habits = get(base_url, '/habits')
+        assert len(habits) == 6
+
+        # a file replaced by something unreadable is skipped
+        with open(path, 'wb') as f:
+            f.write(b'not a parquet file')
+        touch(path, 1)
+        assert get(base_url, '/habits') == habits
+
+        # and the next good file is picked up
+        write_streaks(streaks_df[streaks_df['name'] != habits[0]], path)
+        touch(path, 2)
+        assert get(base_url, '/habits') == habits[1:]
+    finally:
+        server.shutdown()
+        server.server_close()